@@ -1,9 +1,27 @@
 # Python code for Mandelbrot Fractal
 # Import necessary libraries
+import os
+import sys
+import argparse
 from PIL import Image
-from numpy import complex_, array
+from numpy import arange, array, uint8
 import colorsys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from fractal_engine import BACKENDS, complex_grid, escape_time, escape_time_subdivided
+
+# --backend numba uses the compiled multi-core kernel when numba is installed,
+# --subdivide only evaluates rectangle borders and fills uniform rectangles,
+# --no-cardioid iterates the main cardioid and period-2 bulb instead of skipping them,
+# --periodicity stops interior points early once their orbit repeats
+parser = argparse.ArgumentParser(description="Render the Mandelbrot fractal.")
+parser.add_argument('--backend', choices=list(BACKENDS), default='numpy')
+parser.add_argument('--subdivide', action='store_true')
+parser.add_argument('--no-cardioid', action='store_true')
+parser.add_argument('--periodicity', action='store_true')
+args = parser.parse_args()
+shortcuts = dict(cardioid=not args.no_cardioid, periodicity=args.periodicity)
+
 # setting the width of the output image as 1024
 WIDTH = 1024
 
@@ -13,27 +31,27 @@ def rgb_conv(i):
 	color = 255 * array(colorsys.hsv_to_rgb(i / 255.0, 1.0, 0.5))
 	return tuple(color.astype(int))
 
-# function defining a mandelbrot
+# iteration limit: points that have not escaped by then are black
+MAX_ITER = 999
+
+# function defining a mandelbrot: a point that escapes after n steps
+# gets rgb_conv(n + 1), as a lookup into a table of all the colours
 def mandelbrot(x, y):
-	c0 = complex(x, y)
-	c = 0
-	for i in range(1, 1000):
-		if abs(c) > 2:
-			return rgb_conv(i)
-		c = c * c + c0
-	return (0, 0, 0)
-
-# creating the new image in RGB mode
-img = Image.new('RGB', (WIDTH, int(WIDTH / 2)))
-pixels = img.load()
-
-for x in range(img.size[0]):
-
-	# displaying the progress as percentage
-	print("%.2f %%" % (x / WIDTH * 100.0)) 
-	for y in range(img.size[1]):
-		pixels[x, y] = mandelbrot((x - (0.75 * WIDTH)) / (WIDTH / 4),
-									(y - (WIDTH / 4)) / (WIDTH / 4))
+	if args.subdivide:
+		n, evaluated = escape_time_subdivided(complex_grid(x, y), MAX_ITER, args.backend, **shortcuts)
+		print("evaluated %d of %d pixels (%.2f %%)" % (evaluated, n.size, evaluated / n.size * 100.0))
+	else:
+		n = escape_time(complex_grid(x, y), MAX_ITER, backend=args.backend, **shortcuts)
+	palette = array([rgb_conv(i + 1) for i in range(MAX_ITER)] + [(0, 0, 0)], dtype=uint8)
+	return palette[n]
+
+# pixel (x, y) maps to ((x - 0.75 * WIDTH) / (WIDTH / 4), (y - WIDTH / 4) / (WIDTH / 4))
+HEIGHT = int(WIDTH / 2)
+xs = (arange(WIDTH) - (0.75 * WIDTH)) / (WIDTH / 4)
+ys = (arange(HEIGHT) - (WIDTH / 4)) / (WIDTH / 4)
+
+# creating the image in RGB mode
+img = Image.fromarray(mandelbrot(xs, ys), 'RGB')
 
 # to display the created fractal after 
 # completing the given number of iterations
@@ -1,28 +1,35 @@
+import os
+import sys
+import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 
-def mandelbrot(c, max_iter=100):
-    """Checks if a complex number c belongs to the Mandelbrot set."""
-    z = 0
-    n = 0
-    while abs(z) <= 2 and n < max_iter:
-        z = z*z + c
-        n += 1
-    return n
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from fractal_engine import BACKENDS, complex_grid, escape_time, escape_time_subdivided
 
-def create_mandelbrot_set(width, height, x_min, x_max, y_min, y_max, max_iter=100):
+def mandelbrot(c, max_iter=100, backend='numpy', cardioid=True, periodicity=False):
+    """Checks if a complex number c (or an array of them) belongs to the Mandelbrot set."""
+    return escape_time(c, max_iter, backend=backend, cardioid=cardioid, periodicity=periodicity)
+
+def create_mandelbrot_set(width, height, x_min, x_max, y_min, y_max, max_iter=100, backend='numpy', subdivide=False,
+                          cardioid=True, periodicity=False):
     """Creates a Mandelbrot set image."""
     x = np.linspace(x_min, x_max, width)
     y = np.linspace(y_min, y_max, height)
-    image = np.zeros((height, width))
-
-    for i in range(height):
-        for j in range(width):
-            c = complex(x[j], y[i])
-            image[i, j] = mandelbrot(c, max_iter)
-
+    if not subdivide:
+        return mandelbrot(complex_grid(x, y), max_iter, backend, cardioid, periodicity)
+    image, evaluated = escape_time_subdivided(complex_grid(x, y), max_iter, backend,
+                                              cardioid=cardioid, periodicity=periodicity)
+    print(f"Evaluated {evaluated} of {image.size} pixels ({evaluated / image.size:.1%})")
     return image
 
+parser = argparse.ArgumentParser(description="Plot the Mandelbrot set.")
+parser.add_argument('--backend', choices=list(BACKENDS), default='numpy', help="escape-time kernel")
+parser.add_argument('--subdivide', action='store_true', help="Mariani-Silver rectangle subdivision")
+parser.add_argument('--no-cardioid', action='store_true', help="iterate points in the main cardioid and period-2 bulb too")
+parser.add_argument('--periodicity', action='store_true', help="stop interior points early by cycle detection")
+args = parser.parse_args()
+
 # Set parameters
 width, height = 800, 600
 x_min, x_max = -2.0, 1.0
@@ -30,7 +37,8 @@ y_min, y_max = -1.5, 1.5
 max_iter = 100
 
 # Generate and plot the Mandelbrot set
-image = create_mandelbrot_set(width, height, x_min, x_max, y_min, y_max, max_iter)
+image = create_mandelbrot_set(width, height, x_min, x_max, y_min, y_max, max_iter, args.backend, args.subdivide,
+                              not args.no_cardioid, args.periodicity)
 
 plt.imshow(image, extent=(x_min, x_max, y_min, y_max), cmap='hot')
 plt.colorbar()
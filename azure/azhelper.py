@@ -1,13 +1,229 @@
 from azure.cli.core import get_default_cli
-import tempfile
+import io
+import os
+import json
+import time
+import shlex
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from aztrace import tracer
+
+# Only commands whose last command word is one of these read verbs are
+# cached; anything else always runs. TTLs are looked up by the longest
+# matching command prefix.
+CACHEABLE_VERBS = {'list', 'show', 'get', 'exists'}
+DEFAULT_CACHE_TTL = 300
+COMMAND_TTLS = {
+    'account list': 3600,
+    'account show': 3600,
+    'ad user': 900,
+    'ad group': 900,
+}
+CACHE_SIZE = 1024
+
+class AzSession:
+    """A warm az CLI: initialized once, output captured in memory, results returned as Python objects."""
+
+    def __init__(self, cli=None):
+        with tracer.span('az.init'):
+            self.cli = cli or get_default_cli()
+        self.out = io.StringIO()
+        self.last_output = ''
+
+    def run(self, command):
+        """Run one az command (string or argument list) and return (exit code, parsed result)."""
+        args = command_args(command)
+        self.out.seek(0)
+        self.out.truncate()
+        self.cli.result = None
+        with tracer.span('az', command=' '.join(split_command(args)[0])) as span:
+            code = self.cli.invoke(args, out_file=self.out)
+            self.last_output = self.out.getvalue().strip()
+            span.set(exit_code=code)
+            span.add('bytes', len(self.last_output))
+        # The CLI keeps the command's return value on cli.result, so the
+        # formatted output only has to be parsed if that is missing.
+        result = getattr(self.cli.result, 'result', None)
+        if result is None and self.last_output:
+            try:
+                result = json.loads(self.last_output)
+            except ValueError:
+                result = self.last_output
+        return code, result
+
+    def run_batch(self, commands, stop_on_error=False):
+        """Run several commands back to back in this session; returns a list of (exit code, result)."""
+        results = []
+        for command in commands:
+            code, result = self.run(command)
+            results.append((code, result))
+            if code and stop_on_error:
+                break
+        return results
+
+_session = None
+
+def get_session():
+    """The process-wide AzSession, created on first use."""
+    global _session
+    if _session is None:
+        _session = AzSession()
+    return _session
+
+def command_args(command):
+    """Argument list for a command string or list. POSIX quoting would drop the backslashes of Windows paths, so it is off there."""
+    return shlex.split(command, posix=os.name != 'nt') if isinstance(command, str) else list(command)
+
+def split_command(command):
+    """Split an az command into (command words, options), e.g. ('ad', 'user', 'list') and (('--upn', ('x',)),)."""
+    args = command_args(command)
+    words = []
+    while args and not args[0].startswith('-'):
+        words.append(args.pop(0).lower())
+    options = []
+    for arg in args:
+        if arg.startswith('-') and len(arg) > 1:
+            options.append((arg.lower(), []))
+        elif options:
+            options[-1][1].append(arg)
+        else:
+            options.append(('', [arg]))
+    return tuple(words), tuple((name, tuple(values)) for name, values in options)
+
+def cache_key(command):
+    """Normalized form of a command: lower-cased words and options in sorted order."""
+    words, options = split_command(command)
+    return words, tuple(sorted(options))
+
+class AzCache:
+    """LRU cache with per-command TTLs in front of an invoker for read-only az commands.
+
+    `invoker` takes a command and returns (exit code, result); it defaults to
+    the shared AzSession and can be any stub with the same shape. Failed
+    commands are never cached.
+    """
+
+    def __init__(self, invoker=None, maxsize=CACHE_SIZE, ttls=None, default_ttl=DEFAULT_CACHE_TTL,
+                 cacheable_verbs=CACHEABLE_VERBS, clock=time.monotonic):
+        self.invoker = invoker
+        self.maxsize = maxsize
+        self.ttls = COMMAND_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.cacheable_verbs = cacheable_verbs
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def ttl(self, key):
+        words = key[0]
+        for n in range(len(words), 0, -1):
+            ttl = self.ttls.get(' '.join(words[:n]))
+            if ttl is not None:
+                return ttl
+        return self.default_ttl
+
+    def cacheable(self, key):
+        return bool(key[0]) and key[0][-1] in self.cacheable_verbs
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= self.clock():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if value[0] != 0 or not self.cacheable(key):
+            return
+        self.entries[key] = (self.clock() + self.ttl(key), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def run(self, command):
+        key = cache_key(command)
+        if self.cacheable(key):
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                tracer.event('az.cache_hit', command=' '.join(key[0]))
+                return value
+        self.misses += 1
+        invoker = self.invoker or get_session().run
+        value = invoker(command)
+        self.put(key, value)
+        return value
+
+_worker_invoker = None
+
+def _init_worker(invoker_factory):
+    global _worker_invoker
+    _worker_invoker = invoker_factory() if invoker_factory is not None else get_session().run
+
+def _run_in_worker(command):
+    return _worker_invoker(command)
+
+def run_parallel(commands, max_workers=4, max_in_flight=None, cache=None, invoker_factory=None):
+    """Run independent az commands across worker processes, each with its own warm CLI.
+
+    At most `max_in_flight` commands (default: max_workers) are submitted at
+    a time. With a cache, cacheable commands are answered locally when
+    possible, duplicates among them run once (counted as cache hits), and
+    fresh results are stored. `invoker_factory` is a picklable callable
+    returning an invoker for each worker (for stubbing the CLI).
+    Returns (exit code, result) pairs in the order of `commands`.
+    """
+    max_in_flight = max_in_flight or max_workers
+    results = [None] * len(commands)
+    pending = OrderedDict()  # cache key (or unique key for writes) -> indexes waiting on it
+    for i, command in enumerate(commands):
+        key = cache_key(command)
+        if cache is None or not cache.cacheable(key):
+            pending[(key, i)] = [i]
+            continue
+        value = cache.get(key)
+        if value is not None:
+            cache.hits += 1
+            results[i] = value
+        else:
+            pending.setdefault(key, []).append(i)
+    if not pending:
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(invoker_factory,)) as executor:
+        queue = deque(pending.items())
+        in_flight = {}
+        while queue or in_flight:
+            while queue and len(in_flight) < max_in_flight:
+                key, indexes = queue.popleft()
+                in_flight[executor.submit(_run_in_worker, commands[indexes[0]])] = (key, indexes)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, indexes = in_flight.pop(future)
+                value = future.result()
+                if cache is not None:
+                    # As with AzCache.run, the first caller misses and any
+                    # duplicates waiting on it are hits, unless the command
+                    # failed and so would not have been cached.
+                    cache.misses += 1
+                    if value[0] == 0:
+                        cache.hits += len(indexes) - 1
+                    else:
+                        cache.misses += len(indexes) - 1
+                    cache.put(key, value)
+                for i in indexes:
+                    results[i] = value
+    return results
 
 def az_cli (args_str):
-    temp = tempfile.TemporaryFile()
-    args = args_str.split()
-    code = get_default_cli().invoke(args, None, temp)
-    temp.seek(0)
-    data = temp.read().strip()
-    temp.close()
+    session = get_session()
+    code, _ = session.run(args_str)
+    data = session.last_output.encode()
     return [code, data]
 
-## az ad user list --upn "tdube-cl@carmax.com"
\ No newline at end of file
+## az ad user list --upn "tdube-cl@carmax.com"
@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import atexit
+import inspect
+
+# Lightweight timing spans for the Azure scripts. A span records a name, wall
+# time and counters (pages, bytes, tickets, ...) plus any attributes such as
+# the subscription id. While tracing is disabled, span() returns one shared
+# no-op object and the paging wrappers hand back the original iterables, so
+# the instrumented code pays a single attribute check per call.
+#
+# Enable with tracer.enable(...) or the AZTRACE environment variable
+# (AZTRACE=run.ndjson writes NDJSON, AZTRACE=summary prints a table, both
+# at interpreter exit).
+
+SUMMARY_TOP = 10
+
+class _NullSpan:
+    def add(self, key, n=1):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.counters = {}
+        self.start = None
+        self.seconds = None
+
+    def add(self, key, n=1):
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.spans.append(self)
+        return False
+
+    def record(self):
+        record = {'span': self.name, 'start': round(self.start - self.tracer.origin, 6), 'seconds': round(self.seconds, 6)}
+        record.update(self.attrs)
+        record.update(self.counters)
+        return record
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.spans = []
+        self.origin = time.perf_counter()
+
+    def enable(self, ndjson_path=None, summary=False):
+        """Start recording; optionally export NDJSON and/or print a summary when the process exits."""
+        self.enabled = True
+        if ndjson_path:
+            atexit.register(self.write_ndjson, ndjson_path)
+        if summary:
+            atexit.register(self.print_summary)
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def event(self, name, **attrs):
+        """Record a zero-length span, e.g. a cache hit."""
+        if self.enabled:
+            with Span(self, name, attrs):
+                pass
+
+    def pages(self, span, pages):
+        """Wrap a by_page() iterator so each page fetch is counted and timed on span."""
+        if not self.enabled:
+            return pages
+        return self._timed_pages(span, pages)
+
+    def _timed_pages(self, span, pages):
+        pages = iter(pages)
+        while True:
+            start = time.perf_counter()
+            try:
+                page = list(next(pages))
+            except StopIteration:
+                span.add('fetch_seconds', time.perf_counter() - start)
+                return
+            span.add('fetch_seconds', time.perf_counter() - start)
+            span.add('pages')
+            yield page
+
+    def async_pages(self, span, pages):
+        """Async counterpart of pages() for AsyncItemPaged.by_page()."""
+        if not self.enabled:
+            return pages
+        return self._timed_async_pages(span, pages)
+
+    async def _timed_async_pages(self, span, pages):
+        pages = pages.__aiter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                page = [item async for item in await pages.__anext__()]
+            except StopAsyncIteration:
+                span.add('fetch_seconds', time.perf_counter() - start)
+                return
+            span.add('fetch_seconds', time.perf_counter() - start)
+            span.add('pages')
+            yield _AsyncList(page)
+
+    def response_hook(self, span):
+        """raw_response_hook for azure-core calls that adds each response's size to span['bytes']."""
+        if not self.enabled:
+            return None
+        def hook(response):
+            try:
+                span.add('bytes', len(response.http_response.body()))
+            except Exception:
+                pass
+        return hook
+
+    def credential(self, credential):
+        """Proxy a (sync or async) credential so every get_token call is recorded as a span."""
+        if not self.enabled:
+            return credential
+        return _TracedCredential(self, credential)
+
+    def write_ndjson(self, path_or_file):
+        if isinstance(path_or_file, str):
+            with open(path_or_file, 'w') as f:
+                self.write_ndjson(f)
+            return
+        for span in sorted(self.spans, key=lambda span: span.start):
+            path_or_file.write(json.dumps(span.record(), default=str) + '\n')
+
+    def summary(self):
+        """Per span name: count, total/mean/max seconds and summed counters."""
+        rows = {}
+        for span in self.spans:
+            row = rows.setdefault(span.name, {'span': span.name, 'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            row['count'] += 1
+            row['seconds'] += span.seconds
+            row['max_seconds'] = max(row['max_seconds'], span.seconds)
+            for key, value in span.counters.items():
+                row[key] = row.get(key, 0) + value
+        for row in rows.values():
+            row['mean_seconds'] = row['seconds'] / row['count']
+        return sorted(rows.values(), key=lambda row: -row['seconds'])
+
+    def print_summary(self, file=None, top=SUMMARY_TOP):
+        file = file or sys.stderr
+        print(f"{'span':<24} {'count':>6} {'total s':>9} {'mean s':>8} {'max s':>8} {'pages':>7} {'bytes':>11}", file=file)
+        for row in self.summary():
+            print(f"{row['span']:<24} {row['count']:>6} {row['seconds']:>9.3f} {row['mean_seconds']:>8.3f} "
+                  f"{row['max_seconds']:>8.3f} {row.get('pages', 0):>7} {row.get('bytes', 0):>11,}", file=file)
+        slowest = sorted((span for span in self.spans if 'subscription_id' in span.attrs), key=lambda span: -span.seconds)
+        if slowest:
+            print("\nSlowest subscriptions:", file=file)
+            for span in slowest[:top]:
+                print(f"  {span.attrs['subscription_id']}  {span.seconds:.3f}s  {span.counters.get('pages', 0)} pages", file=file)
+
+class _AsyncList:
+    def __init__(self, items):
+        self.items = iter(items)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.items)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+class _TracedCredential:
+    def __init__(self, tracer, credential):
+        self._credential = credential
+        for name in ('get_token', 'get_token_info'):
+            method = getattr(credential, name, None)
+            if method is not None:
+                setattr(self, name, self._timed(tracer, name, method))
+
+    @staticmethod
+    def _timed(tracer, name, method):
+        if inspect.iscoroutinefunction(method):
+            async def timed_async(*args, **kwargs):
+                with tracer.span('credential.' + name):
+                    return await method(*args, **kwargs)
+            return timed_async
+        def timed(*args, **kwargs):
+            with tracer.span('credential.' + name):
+                return method(*args, **kwargs)
+        return timed
+
+    def __getattr__(self, name):
+        return getattr(self._credential, name)
+
+tracer = Tracer()
+
+_env = os.environ.get('AZTRACE')
+if _env:
+    tracer.enable(ndjson_path=None if _env == 'summary' else _env, summary=_env == 'summary')
@@ -0,0 +1,240 @@
+import re
+import json
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+# Local stand-in for the subscription and support ticket APIs, shaped like
+# the azure-mgmt clients getAzSupport.py uses (sync and aio). Every page
+# costs `latency` seconds, so fan-out and paging behaviour can be exercised
+# without an Azure tenant: python getAzSupport.py --fake
+#
+# Ticket listing honours the server-side $filter clauses the real API
+# supports (Status eq '...', CreatedDate ge <ISO 8601>, joined with "and") and
+# rejects anything else, and every filter it receives is recorded in
+# FakeSupportApi.filters.
+
+DEFAULT_SUBSCRIPTIONS = 200
+DEFAULT_TICKETS = 25
+DEFAULT_PAGE_SIZE = 10
+DEFAULT_LATENCY = 0.05
+STATUSES = ['Open', 'Closed', 'Closed', 'Closed']
+FILTER_CLAUSE = re.compile(r"^\s*(?:Status eq '(?P<status>[^']*)'|CreatedDate ge (?P<created>\S+))\s*$", re.IGNORECASE)
+
+def parse_filter(filter):
+    """Turn a support ticket $filter string into a predicate on tickets."""
+    checks = []
+    clauses = re.split(r'\s+and\s+', filter, flags=re.IGNORECASE) if filter else []
+    for clause in clauses:
+        match = FILTER_CLAUSE.match(clause)
+        if match is None:
+            raise ValueError(f'unsupported $filter clause: {clause!r}')
+        if match.group('status') is not None:
+            status = match.group('status')
+            checks.append(lambda ticket, status=status: ticket.status == status)
+        else:
+            created = datetime.fromisoformat(match.group('created').replace('Z', '+00:00'))
+            checks.append(lambda ticket, created=created: ticket.created_date >= created)
+    return lambda ticket: all(check(ticket) for check in checks)
+
+class FakeSubscription:
+    def __init__(self, subscription_id):
+        self.subscription_id = subscription_id
+        self.display_name = subscription_id
+
+class FakeTicket:
+    def __init__(self, subscription_index, index, rng):
+        self.name = f'{subscription_index:04d}{index:06d}'
+        self.title = f'Ticket {index} for subscription {subscription_index}'
+        self.description = 'Synthetic ticket from fake_support_api'
+        self.status = rng.choice(STATUSES)
+        self.created_date = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=rng.randrange(24 * 365))
+        self.modified_date = self.created_date
+
+class FakeSupportApi:
+    """In-memory tenant: `subscriptions` subscriptions with `tickets` tickets each."""
+
+    def __init__(self, subscriptions=DEFAULT_SUBSCRIPTIONS, tickets=DEFAULT_TICKETS, page_size=DEFAULT_PAGE_SIZE,
+                 latency=DEFAULT_LATENCY, slow=None, seed=0):
+        rng = random.Random(seed)
+        self.page_size = page_size
+        self.latency = latency
+        # subscription id -> extra per-page latency, to simulate stragglers
+        self.slow = slow or {}
+        self.subscription_ids = [f'00000000-0000-0000-0000-{i:012d}' for i in range(subscriptions)]
+        self.tickets = {sub_id: [FakeTicket(i, t, rng) for t in range(tickets)]
+                        for i, sub_id in enumerate(self.subscription_ids)}
+        self.requests = 0
+        self.filters = []
+
+    # Simulated changes between polls.
+
+    def add_ticket(self, subscription_id, status='Open', created_date=None):
+        tickets = self.tickets[subscription_id]
+        ticket = FakeTicket(self.subscription_ids.index(subscription_id), len(tickets), random.Random(len(tickets)))
+        ticket.status = status
+        ticket.created_date = ticket.modified_date = created_date or datetime.now(timezone.utc)
+        tickets.append(ticket)
+        return ticket
+
+    def set_status(self, subscription_id, ticket_name, status):
+        for ticket in self.tickets[subscription_id]:
+            if ticket.name == ticket_name:
+                ticket.status = status
+                ticket.modified_date = datetime.now(timezone.utc)
+                return ticket
+        raise KeyError(ticket_name)
+
+    def _pages(self, items):
+        for start in range(0, len(items), self.page_size):
+            yield items[start:start + self.page_size]
+
+    def matching_tickets(self, subscription_id, filter):
+        self.filters.append(filter)
+        matches = parse_filter(filter)
+        return [ticket for ticket in self.tickets[subscription_id] if matches(ticket)]
+
+    def page_latency(self, subscription_id=None):
+        self.requests += 1
+        return self.latency + self.slow.get(subscription_id, 0)
+
+    # Constructors with the same signatures as the real clients.
+
+    def subscription_client(self, credential=None):
+        return _SubscriptionClient(self)
+
+    def support_client(self, credential=None, subscription_id=None):
+        return _SupportClient(self, subscription_id)
+
+    def async_subscription_client(self, credential=None):
+        return _AsyncSubscriptionClient(self)
+
+    def async_support_client(self, credential=None, subscription_id=None):
+        return _AsyncSupportClient(self, subscription_id)
+
+class _Response:
+    """Just enough of azure.core's PipelineResponse for a raw_response_hook to measure the body."""
+
+    def __init__(self, items):
+        self.http_response = self
+        self.body_bytes = json.dumps([vars(item) for item in items], default=str).encode()
+
+    def body(self):
+        return self.body_bytes
+
+class _Paged:
+    """Iterable of items that can also be walked page by page, like azure.core ItemPaged."""
+
+    def __init__(self, api, subscription_id, items, raw_response_hook=None):
+        self.api = api
+        self.subscription_id = subscription_id
+        self.items = items
+        self.raw_response_hook = raw_response_hook
+
+    def _fetched(self, page):
+        if self.raw_response_hook is not None:
+            self.raw_response_hook(_Response(page))
+
+    def by_page(self):
+        for page in self.api._pages(self.items):
+            time.sleep(self.api.page_latency(self.subscription_id))
+            self._fetched(page)
+            yield iter(page)
+
+    def __iter__(self):
+        for page in self.by_page():
+            yield from page
+
+class _AsyncPage:
+    def __init__(self, items):
+        self.items = iter(items)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.items)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+class _AsyncPaged(_Paged):
+    async def by_page(self):
+        for page in self.api._pages(self.items):
+            await asyncio.sleep(self.api.page_latency(self.subscription_id))
+            self._fetched(page)
+            yield _AsyncPage(page)
+
+    async def __aiter__(self):
+        async for page in self.by_page():
+            async for item in page:
+                yield item
+
+class _Subscriptions:
+    paged = _Paged
+
+    def __init__(self, api):
+        self.api = api
+
+    def list(self, raw_response_hook=None, **kwargs):
+        subscriptions = [FakeSubscription(sub_id) for sub_id in self.api.subscription_ids]
+        return self.paged(self.api, None, subscriptions, raw_response_hook)
+
+class _SupportTickets:
+    paged = _Paged
+
+    def __init__(self, api, subscription_id):
+        self.api = api
+        self.subscription_id = subscription_id
+
+    def list(self, top=None, filter=None, raw_response_hook=None, **kwargs):
+        return self.paged(self.api, self.subscription_id, self.api.matching_tickets(self.subscription_id, filter),
+                          raw_response_hook)
+
+    def get(self, support_ticket_name, raw_response_hook=None, **kwargs):
+        time.sleep(self.api.page_latency(self.subscription_id))
+        for ticket in self.api.tickets[self.subscription_id]:
+            if ticket.name == support_ticket_name:
+                if raw_response_hook is not None:
+                    raw_response_hook(_Response([ticket]))
+                return ticket
+        raise KeyError(support_ticket_name)
+
+class _SubscriptionClient:
+    def __init__(self, api):
+        self.subscriptions = _Subscriptions(api)
+
+    def close(self):
+        pass
+
+class _SupportClient:
+    def __init__(self, api, subscription_id):
+        self.support_tickets = _SupportTickets(api, subscription_id)
+
+    def close(self):
+        pass
+
+class _AsyncSubscriptions(_Subscriptions):
+    paged = _AsyncPaged
+
+class _AsyncSupportTickets(_SupportTickets):
+    paged = _AsyncPaged
+
+class _AsyncClient:
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+class _AsyncSubscriptionClient(_AsyncClient):
+    def __init__(self, api):
+        self.subscriptions = _AsyncSubscriptions(api)
+
+class _AsyncSupportClient(_AsyncClient):
+    def __init__(self, api, subscription_id):
+        self.support_tickets = _AsyncSupportTickets(api, subscription_id)
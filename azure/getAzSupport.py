@@ -1,37 +1,221 @@
 import os
+import sys
+import asyncio
+import argparse
 from azure.identity import DefaultAzureCredential
 from azure.mgmt.resource import SubscriptionClient
-from azure.mgmt.support import SupportManagementClient
+# The support SDK's client class is MicrosoftSupport; SupportManagementClient
+# was never exported by azure-mgmt-support.
+from azure.mgmt.support import MicrosoftSupport as SupportManagementClient
+from aztrace import tracer
+
+# Subscriptions queried at once by the async variant, and how long one
+# subscription may take (all of its pages) before it is abandoned.
+DEFAULT_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 60
+# Status filtering happens server side, so closed tickets are never sent.
+OPEN_FILTER = "Status eq 'Open'"
+
+def status_filter(status):
+    return f"Status eq '{status}'"
+
+def ticket_record(subscription_id, ticket):
+    """Normalize an SDK ticket into the plain dict the rest of the script prints."""
+    return {
+        'subscription_id': subscription_id,
+        'ticket_id': ticket.name,
+        'title': ticket.title,
+        'description': ticket.description,
+        'status': ticket.status,
+        'created_date': ticket.created_date,
+        'modified_date': getattr(ticket, 'modified_date', None)
+    }
+
+def _hook_kwargs(span):
+    # Only pass a raw_response_hook while tracing, so untraced calls are unchanged.
+    hook = tracer.response_hook(span)
+    return {'raw_response_hook': hook} if hook is not None else {}
+
+def list_subscription_ids(subscription_client):
+    with tracer.span('subscriptions.list') as span:
+        pages = subscription_client.subscriptions.list(**_hook_kwargs(span)).by_page()
+        return [subscription.subscription_id for page in tracer.pages(span, pages) for subscription in page]
+
+def iter_support_tickets(status='Open', credential=None, subscription_client=None, support_client_factory=None):
+    """Lazily yield ticket records with the given status from every subscription.
+
+    The status is sent as a $filter so the service only returns matching
+    tickets, and records are yielded page by page as each page arrives.
+    The clients default to the azure SDK and can be replaced with
+    fake_support_api stand-ins.
+
+    When tracing, each subscription's span covers the time its records were
+    being consumed too; its fetch_seconds counter is the time spent waiting
+    on the service.
+    """
+    credential = tracer.credential(credential or DefaultAzureCredential())
+    subscription_client = subscription_client or SubscriptionClient(credential)
+    support_client_factory = support_client_factory or SupportManagementClient
+
+    for subscription_id in list_subscription_ids(subscription_client):
+        support_client = support_client_factory(credential, subscription_id)
+        try:
+            with tracer.span('subscription', subscription_id=subscription_id) as span:
+                tickets = support_client.support_tickets.list(filter=status_filter(status), **_hook_kwargs(span))
+                for page in tracer.pages(span, tickets.by_page()):
+                    for ticket in page:
+                        span.add('tickets')
+                        yield ticket_record(subscription_id, ticket)
+        finally:
+            support_client.close()
 
 def get_open_support_tickets():
-    credential = DefaultAzureCredential()
-    subscription_client = SubscriptionClient(credential)
-    open_tickets = []
-
-    for subscription in subscription_client.subscriptions.list():
-        subscription_id = subscription.subscription_id
-        support_client = SupportManagementClient(credential, subscription_id)
-        
-        for ticket in support_client.support_tickets.list():
-            if ticket.status == 'Open':
-                open_tickets.append({
-                    'subscription_id': subscription_id,
-                    'ticket_id': ticket.name,
-                    'title': ticket.title,
-                    'description': ticket.description,
-                    'status': ticket.status,
-                    'created_date': ticket.created_date
-                })
-
-    return open_tickets
+    return list(iter_support_tickets('Open'))
+
+def _async_clients():
+    from azure.identity.aio import DefaultAzureCredential as AsyncDefaultAzureCredential
+    from azure.mgmt.resource.subscriptions.aio import SubscriptionClient as AsyncSubscriptionClient
+    from azure.mgmt.support.aio import MicrosoftSupport as AsyncSupportManagementClient
+    return AsyncDefaultAzureCredential, AsyncSubscriptionClient, AsyncSupportManagementClient
+
+async def iter_open_support_tickets_async(concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, credential=None,
+                                          subscription_client_factory=None, support_client_factory=None,
+                                          errors=None):
+    """Yield open tickets from every subscription as they arrive.
+
+    Up to `concurrency` subscriptions are paged at once, all sharing one
+    credential. A subscription that takes longer than `timeout` seconds is
+    cancelled; its (subscription_id, exception) is appended to `errors` if a
+    list is given. The client factories default to the azure aio clients and
+    can be swapped for fake_support_api stand-ins.
+    """
+    owns_credential = credential is None
+    if credential is None or subscription_client_factory is None or support_client_factory is None:
+        credential_class, subscription_class, support_class = _async_clients()
+        credential = credential or credential_class()
+        subscription_client_factory = subscription_client_factory or subscription_class
+        support_client_factory = support_client_factory or support_class
+    credential = tracer.credential(credential)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results = asyncio.Queue()
+    done = object()
+
+    async def page_subscription(subscription_id):
+        with tracer.span('subscription', subscription_id=subscription_id) as span:
+            async with support_client_factory(credential, subscription_id) as support_client:
+                tickets = support_client.support_tickets.list(filter=OPEN_FILTER, **_hook_kwargs(span))
+                async for page in tracer.async_pages(span, tickets.by_page()):
+                    async for ticket in page:
+                        span.add('tickets')
+                        await results.put(ticket_record(subscription_id, ticket))
+
+    async def query_subscription(subscription_id):
+        try:
+            async with semaphore:
+                await asyncio.wait_for(page_subscription(subscription_id), timeout)
+        except Exception as exc:
+            if errors is not None:
+                errors.append((subscription_id, exc))
+        finally:
+            await results.put(done)
+
+    tasks = []
+    listing_errors = []
+    # Every task (the subscription listing and one per subscription) puts
+    # `done` when it finishes, so tickets are yielded while the subscription
+    # list is still being paged.
+    remaining = 1
+
+    async def list_subscriptions():
+        nonlocal remaining
+        try:
+            with tracer.span('subscriptions.list') as span:
+                async with subscription_client_factory(credential) as subscription_client:
+                    pages = subscription_client.subscriptions.list(**_hook_kwargs(span)).by_page()
+                    async for page in tracer.async_pages(span, pages):
+                        async for subscription in page:
+                            remaining += 1
+                            tasks.append(asyncio.create_task(query_subscription(subscription.subscription_id)))
+        except Exception as exc:
+            listing_errors.append(exc)
+        finally:
+            await results.put(done)
+
+    tasks.append(asyncio.create_task(list_subscriptions()))
+    try:
+        while remaining:
+            item = await results.get()
+            if item is done:
+                remaining -= 1
+            else:
+                yield item
+        if listing_errors:
+            raise listing_errors[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if owns_credential:
+            await credential.close()
+
+async def collect_open_support_tickets_async(**kwargs):
+    return [ticket async for ticket in iter_open_support_tickets_async(**kwargs)]
+
+def print_ticket(ticket):
+    print(f"Subscription ID: {ticket['subscription_id']}")
+    print(f"Ticket ID: {ticket['ticket_id']}")
+    print(f"Title: {ticket['title']}")
+    print(f"Description: {ticket['description']}")
+    print(f"Status: {ticket['status']}")
+    print(f"Created Date: {ticket['created_date']}")
+    print("-" * 40)
+
+async def print_open_tickets_async(args):
+    kwargs = {'concurrency': args.concurrency, 'timeout': args.timeout, 'errors': []}
+    if args.fake:
+        from fake_support_api import FakeSupportApi
+        api = FakeSupportApi()
+        kwargs.update(credential=object(), subscription_client_factory=api.async_subscription_client,
+                      support_client_factory=api.async_support_client)
+    async for ticket in iter_open_support_tickets_async(**kwargs):
+        print_ticket(ticket)
+    for subscription_id, exc in kwargs['errors']:
+        print(f"Subscription {subscription_id} failed: {exc!r}", file=sys.stderr)
 
 if __name__ == "__main__":
-    open_tickets = get_open_support_tickets()
-    for ticket in open_tickets:
-        print(f"Subscription ID: {ticket['subscription_id']}")
-        print(f"Ticket ID: {ticket['ticket_id']}")
-        print(f"Title: {ticket['title']}")
-        print(f"Description: {ticket['description']}")
-        print(f"Status: {ticket['status']}")
-        print(f"Created Date: {ticket['created_date']}")
-        print("-" * 40)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='List open Azure support tickets across all subscriptions.')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='query subscriptions concurrently')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='subscriptions queried at once (--async)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='seconds allowed per subscription (--async)')
+    parser.add_argument('--fake', action='store_true', help='run against the local fake_support_api stand-in')
+    parser.add_argument('--cache', metavar='DB', help='sync into a SQLite cache and only fetch what changed since the last poll')
+    parser.add_argument('--refresh', action='store_true', help='with --cache, re-list subscriptions and re-crawl every ticket')
+    parser.add_argument('--trace', metavar='NDJSON', help='record per-phase and per-subscription timings to this file')
+    parser.add_argument('--trace-summary', action='store_true', help='print a timing summary to stderr at the end')
+    args = parser.parse_args()
+    if args.use_async and args.cache:
+        parser.error('--cache syncs subscriptions one at a time and cannot be combined with --async')
+    if args.trace or args.trace_summary:
+        tracer.enable(args.trace, args.trace_summary)
+
+    if args.use_async:
+        asyncio.run(print_open_tickets_async(args))
+    else:
+        kwargs = {}
+        if args.fake:
+            from fake_support_api import FakeSupportApi
+            api = FakeSupportApi()
+            kwargs.update(credential=object(), subscription_client=api.subscription_client(),
+                          support_client_factory=api.support_client)
+        if args.cache:
+            from ticket_cache import TicketCache
+            credential = tracer.credential(kwargs.get('credential') or DefaultAzureCredential())
+            with TicketCache(args.cache) as cache:
+                cache.sync(credential, kwargs.get('subscription_client') or SubscriptionClient(credential),
+                           kwargs.get('support_client_factory') or SupportManagementClient, force=args.refresh)
+                tickets = cache.tickets('Open')
+        else:
+            tickets = iter_support_tickets('Open', **kwargs)
+        for ticket in tickets:
+            print_ticket(ticket)
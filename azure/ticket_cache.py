@@ -0,0 +1,165 @@
+import sqlite3
+import time
+from datetime import datetime, timezone
+from aztrace import tracer
+from getAzSupport import OPEN_FILTER, ticket_record, list_subscription_ids, _hook_kwargs
+
+# SQLite cache behind getAzSupport.py --cache. The subscription list is kept
+# for SUBSCRIPTION_TTL seconds instead of being re-listed on every poll.
+#
+# Tickets are synced per subscription against a watermark: the newest
+# created date already stored. A poll lists the tickets created since then
+# (CreatedDate ge <watermark>, any status), so tickets opened and closed
+# between two polls are still recorded. The support API can only filter on
+# Status and CreatedDate, not on modification time, so changes to older
+# tickets are caught by also listing the open ones (Status eq 'Open', usually
+# a single page). Only tickets that are new or modified after the cached copy
+# are written. Cached open tickets missing from both lists have changed
+# status; just those are fetched individually with support_tickets.get. The
+# first sync of a subscription (or --refresh) lists only the open tickets.
+
+DEFAULT_CACHE_PATH = 'support_tickets.db'
+SUBSCRIPTION_TTL = 6 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL
+);
+CREATE TABLE IF NOT EXISTS subscriptions (
+    subscription_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    subscription_id TEXT PRIMARY KEY,
+    created_since TEXT,
+    synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tickets (
+    subscription_id TEXT NOT NULL,
+    ticket_id TEXT NOT NULL,
+    title TEXT,
+    description TEXT,
+    status TEXT,
+    created_date TEXT,
+    modified_date TEXT,
+    PRIMARY KEY (subscription_id, ticket_id)
+);
+CREATE INDEX IF NOT EXISTS tickets_status ON tickets (status);
+"""
+
+TICKET_COLUMNS = ('subscription_id', 'ticket_id', 'title', 'description', 'status', 'created_date', 'modified_date')
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _modified(record):
+    return _isoformat(record['modified_date'] or record['created_date'])
+
+def _created_since_filter(watermark):
+    # Whole seconds in UTC, rounded down: tickets created in the watermark's
+    # own second come back again and are skipped as unchanged.
+    created = datetime.fromisoformat(watermark).astimezone(timezone.utc)
+    return f"CreatedDate ge {created.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+
+class TicketCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, subscription_ttl=SUBSCRIPTION_TTL):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.subscription_ttl = subscription_ttl
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def subscription_ids(self, subscription_client, force=False):
+        """Cached subscription ids, re-listed from the service when older than the TTL (or forced)."""
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'subscriptions_fetched_at'").fetchone()
+        if not force and row is not None and time.time() - row[0] < self.subscription_ttl:
+            return [sub_id for (sub_id,) in self.db.execute('SELECT subscription_id FROM subscriptions')]
+
+        subscription_ids = list_subscription_ids(subscription_client)
+        with self.db:
+            self.db.execute('DELETE FROM subscriptions')
+            self.db.executemany('INSERT INTO subscriptions VALUES (?)', [(sub_id,) for sub_id in subscription_ids])
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('subscriptions_fetched_at', ?)", (time.time(),))
+        return subscription_ids
+
+    def _upsert(self, record):
+        self.db.execute(f"INSERT OR REPLACE INTO tickets VALUES ({', '.join('?' * len(TICKET_COLUMNS))})",
+                        [_isoformat(record.get(column)) for column in TICKET_COLUMNS])
+
+    def sync_subscription(self, subscription_id, support_client, force=False):
+        """Bring one subscription's cached tickets up to date; returns how many rows changed."""
+        with tracer.span('subscription', subscription_id=subscription_id) as span:
+            changed = self._sync_subscription(subscription_id, support_client, force, span)
+            span.add('changed', changed)
+        return changed
+
+    def _sync_subscription(self, subscription_id, support_client, force, span):
+        row = self.db.execute('SELECT created_since FROM watermarks WHERE subscription_id = ?', (subscription_id,)).fetchone()
+        changed = 0
+        with self.db:
+            if force or row is None:
+                self.db.execute('DELETE FROM tickets WHERE subscription_id = ?', (subscription_id,))
+                watermark = None
+            else:
+                watermark = row[0]
+            # Modified dates of the cached tickets a listing may return: the
+            # open ones, and any created at or after the watermark.
+            cached = dict(self.db.execute(
+                "SELECT ticket_id, modified_date FROM tickets WHERE subscription_id = ? AND (status = 'Open' OR created_date >= ?)",
+                (subscription_id, watermark or '')))
+            cached_open = {ticket_id for (ticket_id,) in self.db.execute(
+                "SELECT ticket_id FROM tickets WHERE subscription_id = ? AND status = 'Open'", (subscription_id,))}
+
+            seen = set()
+            filters = [OPEN_FILTER] if watermark is None else [_created_since_filter(watermark), OPEN_FILTER]
+            for filter in filters:
+                tickets = support_client.support_tickets.list(filter=filter, **_hook_kwargs(span))
+                for page in tracer.pages(span, tickets.by_page()):
+                    for ticket in page:
+                        record = ticket_record(subscription_id, ticket)
+                        if record['ticket_id'] in seen:
+                            continue
+                        seen.add(record['ticket_id'])
+                        if cached.get(record['ticket_id']) == _modified(record):
+                            continue
+                        self._upsert(record)
+                        changed += 1
+                        watermark = max(watermark or '', _isoformat(record['created_date']))
+
+            for ticket_id in cached_open - seen:
+                record = ticket_record(subscription_id, support_client.support_tickets.get(ticket_id, **_hook_kwargs(span)))
+                span.add('gets')
+                self._upsert(record)
+                changed += 1
+
+            self.db.execute('INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)', (subscription_id, watermark, time.time()))
+        return changed
+
+    def sync(self, credential, subscription_client, support_client_factory, force=False):
+        """Sync every subscription; force re-lists subscriptions and re-crawls all tickets."""
+        subscription_ids = self.subscription_ids(subscription_client, force)
+        with self.db:
+            # Forget subscriptions that no longer exist.
+            self.db.execute('DELETE FROM tickets WHERE subscription_id NOT IN (SELECT subscription_id FROM subscriptions)')
+            self.db.execute('DELETE FROM watermarks WHERE subscription_id NOT IN (SELECT subscription_id FROM subscriptions)')
+        fetched = 0
+        for subscription_id in subscription_ids:
+            support_client = support_client_factory(credential, subscription_id)
+            try:
+                fetched += self.sync_subscription(subscription_id, support_client, force)
+            finally:
+                support_client.close()
+        return fetched
+
+    def tickets(self, status='Open'):
+        """Cached ticket records with the given status, oldest first."""
+        rows = self.db.execute(f"SELECT {', '.join(TICKET_COLUMNS)} FROM tickets WHERE status = ? ORDER BY created_date",
+                               (status,))
+        return [dict(zip(TICKET_COLUMNS, row)) for row in rows]
@@ -1,11 +1,34 @@
+import os
+import sys
+import csv
+import json
+import math
+import time
 import random
-random.seed()
+import argparse
+from typing import Optional
+from dataclasses import dataclass, asdict, fields
+from concurrent.futures import ProcessPoolExecutor
+
+# The pure-Python engines draw from their own generator, so seeding a
+# simulation never touches the random module's global state.
+_rng = random.Random()
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DAYS_IN_YEAR = 365
+# The NumPy engine draws parties in chunks of about this many birthdays,
+# which bounds its memory no matter how many parties are simulated.
+CHUNK_BIRTHDAYS = 1 << 22
 
 # First, the `Person` object. All each person needs is a birthday.
 
 class Person:
     def __init__( self ):
-        self.birthday = random.randint( 1, 365 )
+        self.birthday = _rng.randint( 1, 365 )
 
 # After that we need a Party object, which must be able to
 # contain a bunch of people and check to see whether any
@@ -18,28 +41,371 @@ class Party:
         self.check_matching_birthdays()
 
     def check_matching_birthdays( self ):
-        birthday_frequencies = { b:0 for b in self.birthdays }
-        for b in self.birthdays: birthday_frequencies[b] += 1
+        # One byte per day of the year; a date is counted the moment its
+        # second birthday arrives.
+        counts = bytearray( DAYS_IN_YEAR + 1 )
+        self.matching_dates = 0
         for b in self.birthdays:
-            if birthday_frequencies[b] < 2:
-                del birthday_frequencies[b]
-        self.matching_dates = len(birthday_frequencies)
+            if counts[b] < 2:
+                counts[b] += 1
+                if counts[b] == 2:
+                    self.matching_dates += 1
+
+# Counting parties with at least one shared birthday can be done either by
+# building `Party` objects one at a time, or with NumPy: draw a whole chunk
+# of parties as a `(parties, partiers)` matrix, sort each row, and look for
+# equal neighbours. Both give the same distribution of results.
+
+def count_matching_parties( parties, partiers ):
+    return sum( 1 for p in range( parties ) if Party( partiers ).matching_dates )
+
+def _birthday_dtype( days ):
+    return np.int16 if days <= np.iinfo( np.int16 ).max else np.int64
+
+def count_matching_parties_numpy( parties, partiers, days=DAYS_IN_YEAR, rng=None ):
+    rng = rng if rng is not None else np.random.default_rng()
+    chunk = max( 1, CHUNK_BIRTHDAYS // max( partiers, 1 ) )
+    matches = 0
+    for start in range( 0, parties, chunk ):
+        rows = min( chunk, parties - start )
+        birthdays = rng.integers( 0, days, size=(rows, partiers), dtype=_birthday_dtype( days ) )
+        birthdays.sort( axis=1 )
+        matches += int( np.count_nonzero( ( birthdays[:, 1:] == birthdays[:, :-1] ).any( axis=1 ) ) )
+    return matches
+
+# The general case: a party "matches" when at least k people share a date,
+# the calendar has any number of days (e.g. 2**32 for hash collisions), and
+# dates need not be equally likely. Non-uniform dates are drawn from a Walker
+# alias table, one uniform index plus one coin flip per birthday.
+#
+# A single party is checked with a byte of count per date when the calendar
+# is small, and otherwise by sorting it and comparing every birthday with the
+# one k-1 places later. The NumPy engine always sorts: over a whole chunk of
+# parties that is several times faster than filling count arrays, and its
+# memory stays proportional to the party rather than the calendar.
+
+# Above this many days a per-party count array costs more than sorting.
+COUNT_ARRAY_DAYS = 1 << 16
+
+class AliasTable:
+    def __init__( self, weights ):
+        n = len( weights )
+        total = float( sum( weights ) )
+        scaled = [ w * n / total for w in weights ]
+        prob  = [ 1.0 ] * n
+        alias = list( range( n ) )
+        small = [ i for i, p in enumerate( scaled ) if p < 1.0 ]
+        large = [ i for i, p in enumerate( scaled ) if p >= 1.0 ]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s], alias[s] = scaled[s], l
+            scaled[l] += scaled[s] - 1.0
+            ( small if scaled[l] < 1.0 else large ).append( l )
+        self.days = n
+        self.prob = np.array( prob ) if np is not None else prob
+        self.alias = np.array( alias ) if np is not None else alias
+
+    def choice( self ):
+        i = _rng.randrange( self.days )
+        return i if _rng.random() < self.prob[i] else self.alias[i]
+
+    def sample( self, size, rng ):
+        i = rng.integers( 0, self.days, size=size )
+        return np.where( rng.random( size ) < self.prob[i], i, self.alias[i] )
+
+def has_k_match( birthdays, k=2, days=DAYS_IN_YEAR ):
+    if days <= COUNT_ARRAY_DAYS:
+        counts = bytearray( days )
+        for b in birthdays:
+            counts[b] += 1
+            if counts[b] == k:
+                return True
+        return False
+    ordered = sorted( birthdays )
+    return any( ordered[i] == ordered[i + k - 1] for i in range( len( ordered ) - k + 1 ) )
+
+def _draw_birthdays( rows, partiers, days, table, rng ):
+    if table is not None:
+        return table.sample( (rows, partiers), rng )
+    return rng.integers( 0, days, size=(rows, partiers), dtype=_birthday_dtype( days ) )
+
+def count_k_matching_parties( parties, partiers, k=2, days=DAYS_IN_YEAR, weights=None, rng=None ):
+    """Parties in which at least k partiers share a date; weights (one per day) make the calendar non-uniform."""
+    table = AliasTable( weights ) if weights is not None else None
+    days = table.days if table is not None else days
+    if np is None:
+        draw = table.choice if table is not None else lambda: _rng.randrange( days )
+        return sum( 1 for p in range( parties ) if has_k_match( [ draw() for i in range( partiers ) ], k, days ) )
+
+    rng = rng if rng is not None else np.random.default_rng()
+    if k < 2 or partiers < k:
+        return parties if k < 2 and partiers else 0
+    chunk = max( 1, CHUNK_BIRTHDAYS // partiers )
+    matches = 0
+    for start in range( 0, parties, chunk ):
+        rows = min( chunk, parties - start )
+        birthdays = _draw_birthdays( rows, partiers, days, table, rng )
+        birthdays.sort( axis=1 )
+        matched = ( birthdays[:, k - 1:] == birthdays[:, :partiers - k + 1] ).any( axis=1 )
+        matches += int( np.count_nonzero( matched ) )
+    return matches
+
+# For many cores, the parties are split evenly between worker processes.
+# Each worker gets its own generator from SeedSequence.spawn(), so the
+# streams are independent and the merged count is the same every time for a
+# given seed and number of workers.
+
+def _count_worker( args ):
+    parties, partiers, days, seed_sequence = args
+    return count_matching_parties_numpy( parties, partiers, days, np.random.default_rng( seed_sequence ) )
+
+def count_matching_parties_parallel( parties, partiers, days=DAYS_IN_YEAR, seed=None, workers=None ):
+    workers = max( 1, min( workers or os.cpu_count() or 1, parties ) )
+    streams = np.random.SeedSequence( seed ).spawn( workers )
+    shares = [ parties // workers + ( 1 if w < parties % workers else 0 ) for w in range( workers ) ]
+    jobs = [ ( share, partiers, days, stream ) for share, stream in zip( shares, streams ) ]
+    if workers == 1:
+        return _count_worker( jobs[0] )
+    with ProcessPoolExecutor( max_workers=workers ) as executor:
+        return sum( executor.map( _count_worker, jobs ) )
+
+ENGINES = { 'party': count_matching_parties, 'collision': count_k_matching_parties }
+if np is not None:
+    ENGINES['numpy'] = count_matching_parties_numpy
+    ENGINES['parallel'] = count_matching_parties_parallel
+DEFAULT_ENGINE = 'numpy' if np is not None else 'party'
+
+# The whole probability curve from one simulation: keep adding people to a
+# party until someone repeats a birthday, and record how big the party was
+# at that point. A party of n has a match exactly when that first repeat
+# comes at or before person n, so the empirical CDF of the first-repeat size
+# gives P(match) for every n at once.
+
+SWEEP_MAX_PARTIERS = 100
+
+def exact_match_probability( partiers, days=DAYS_IN_YEAR ):
+    no_match = 1.0
+    for i in range( partiers ):
+        no_match *= ( days - i ) / days
+    return 1.0 - no_match
+
+def first_match_sizes( trials, max_partiers=SWEEP_MAX_PARTIERS, days=DAYS_IN_YEAR, rng=None ):
+    """Party size at which each trial's first repeated birthday appears (max_partiers + 1 if none by then)."""
+    if np is None:
+        sizes = []
+        for t in range( trials ):
+            seen = set()
+            size = max_partiers + 1
+            for n in range( 1, max_partiers + 1 ):
+                b = _rng.randint( 1, days )
+                if b in seen:
+                    size = n
+                    break
+                seen.add( b )
+            sizes.append( size )
+        return sizes
+
+    rng = rng if rng is not None else np.random.default_rng()
+    chunk = max( 1, CHUNK_BIRTHDAYS // max_partiers )
+    sizes = np.empty( trials, dtype=np.int64 )
+    for start in range( 0, trials, chunk ):
+        rows = min( chunk, trials - start )
+        birthdays = rng.integers( 0, days, size=(rows, max_partiers), dtype=_birthday_dtype( days ) )
+        # A stable sort keeps equal birthdays in arrival order, so for each
+        # adjacent equal pair the right-hand index is a repeat; the smallest
+        # such index in a row is its first repeat.
+        order = np.argsort( birthdays, axis=1, kind='stable' )
+        ordered = np.take_along_axis( birthdays, order, axis=1 )
+        repeat_at = np.where( ordered[:, 1:] == ordered[:, :-1], order[:, 1:], max_partiers )
+        sizes[start:start + rows] = repeat_at.min( axis=1 ) + 1
+    return sizes
+
+def match_probability_curve( trials, max_partiers=SWEEP_MAX_PARTIERS, days=DAYS_IN_YEAR, rng=None ):
+    """(partiers, simulated P(match), exact P(match), absolute error) for 2..max_partiers partiers."""
+    if trials < 1:
+        raise ValueError( 'the probability curve needs at least one trial' )
+    if np is not None:
+        counts = np.bincount( first_match_sizes( trials, max_partiers, days, rng ), minlength=max_partiers + 2 ).tolist()
+    else:
+        counts = [ 0 ] * ( max_partiers + 2 )
+        for size in first_match_sizes( trials, max_partiers, days ):
+            counts[size] += 1
+    curve = []
+    matched = counts[0] + counts[1]
+    for partiers in range( 2, max_partiers + 1 ):
+        matched += counts[partiers]
+        simulated = matched / trials
+        exact = exact_match_probability( partiers, days )
+        curve.append( ( partiers, simulated, exact, abs( simulated - exact ) ) )
+    return curve
+
+def print_curve( curve ):
+    print( f"{'partiers':>8} {'simulated':>10} {'exact':>10} {'abs error':>10}" )
+    for partiers, simulated, exact, error in curve:
+        print( f"{partiers:>8} {simulated:>10.6f} {exact:>10.6f} {error:>10.6f}" )
+
+def write_curve_csv( curve, path ):
+    with open( path, 'w', newline='' ) as f:
+        writer = csv.writer( f )
+        writer.writerow( [ 'partiers', 'simulated', 'exact', 'abs_error' ] )
+        writer.writerows( curve )
+
+# Rather than guessing how many parties to simulate, we can ask for a
+# precision: simulate in batches, keep a Wilson score interval for the
+# fraction of parties with a match, and stop once its half-width is within
+# the target. Batches double in size so the interval is not recomputed
+# more often than it needs to be.
+
+Z_95 = 1.959963984540054
+FIRST_BATCH = 1000
+MAX_BATCH = 1 << 20
+
+def wilson_interval( matches, parties, z=Z_95 ):
+    if parties == 0:
+        return 0.0, 1.0
+    p = matches / parties
+    z2 = z * z
+    centre = ( p + z2 / ( 2 * parties ) ) / ( 1 + z2 / parties )
+    spread = z * math.sqrt( p * ( 1 - p ) / parties + z2 / ( 4 * parties * parties ) ) / ( 1 + z2 / parties )
+    return centre - spread, centre + spread
+
+def simulate_to_precision( partiers, half_width, engine=DEFAULT_ENGINE, z=Z_95, max_parties=None ):
+    """Simulate until the Wilson interval is at most +/- half_width; returns (fraction, low, high, parties)."""
+    if half_width <= 0:
+        raise ValueError( 'target half-width must be positive' )
+    count = ENGINES[engine]
+    matches = parties = 0
+    batch = FIRST_BATCH
+    while True:
+        if max_parties is not None:
+            batch = min( batch, max_parties - parties )
+        matches += count( batch, partiers )
+        parties += batch
+        low, high = wilson_interval( matches, parties, z )
+        if ( high - low ) / 2 <= half_width or parties == max_parties:
+            return matches / parties, low, high, parties
+        batch = min( batch * 2, MAX_BATCH )
+
+# For scripts and batch jobs, simulate() runs one engine with an optional
+# seed and returns a SimulationResult instead of printing, and bench() times
+# the engines against each other on the same problem.
+
+@dataclass
+class SimulationResult:
+    engine: str
+    parties: int
+    partiers: int
+    matches: int
+    fraction: float
+    exact: float
+    seed: Optional[int] = None
+    seconds: float = 0.0
+
+def simulate( parties, partiers, engine=DEFAULT_ENGINE, seed=None, workers=None ):
+    if engine not in ENGINES:
+        raise ValueError( f'unknown engine {engine!r}; choose from {", ".join( ENGINES )}' )
+    _rng.seed( seed )
+    start = time.perf_counter()
+    if engine == 'parallel':
+        matches = count_matching_parties_parallel( parties, partiers, seed=seed, workers=workers )
+    elif engine == 'party' or np is None:
+        matches = ENGINES[engine]( parties, partiers )
+    else:
+        matches = ENGINES[engine]( parties, partiers, rng=np.random.default_rng( seed ) )
+    seconds = time.perf_counter() - start
+    return SimulationResult( engine, parties, partiers, matches, matches / parties if parties else 0.0,
+                             exact_match_probability( partiers ), seed, seconds )
+
+def bench( parties=20000, partiers=23, engines=None, repeat=3, seed=0 ):
+    """Best-of-repeat SimulationResult for each engine, all on the same problem."""
+    results = []
+    for engine in engines or ENGINES:
+        runs = [ simulate( parties, partiers, engine, seed ) for r in range( repeat ) ]
+        results.append( min( runs, key=lambda result: result.seconds ) )
+    return results
+
+def print_bench( results, file=None ):
+    file = file or sys.stdout
+    baseline = next( ( r.seconds for r in results if r.engine == 'party' ), None )
+    print( f"{'engine':<10} {'seconds':>9} {'parties/s':>12} {'speedup':>8} {'fraction':>9}", file=file )
+    for r in results:
+        speedup = f'{baseline / r.seconds:.1f}x' if baseline and r.seconds else '-'
+        print( f"{r.engine:<10} {r.seconds:>9.4f} {r.parties / r.seconds:>12,.0f} {speedup:>8} {r.fraction:>9.4f}", file=file )
+
+def write_results( results, fmt, file=None ):
+    file = file or sys.stdout
+    if fmt == 'json':
+        json.dump( [ asdict( r ) for r in results ], file, indent=2 )
+        file.write( '\n' )
+    elif fmt == 'csv':
+        writer = csv.DictWriter( file, [ f.name for f in fields( SimulationResult ) ] )
+        writer.writeheader()
+        writer.writerows( asdict( r ) for r in results )
+    else:
+        for r in results:
+            print( f'{r.engine}: {r.matches} of {r.parties} parties of {r.partiers} matched '
+                   f'({r.fraction:.6f}, exact {r.exact:.6f}) in {r.seconds:.3f}s', file=file )
 
 # Finally, we need the _**main()**_ function
 # allowing the user to choose the number of parties and attendees.
+# Answering "all" for the partiers prints the whole curve from 2 to 100,
+# which can also be saved as CSV. A number of parties below 1 is taken as
+# the target precision instead, e.g. 0.005 for +/- half a percent.
 
-def main():
+def main( engine=DEFAULT_ENGINE ):
     while True:
-        parties  = int(input("Number of parties:  "))
-        partiers = int(input("Number of partiers: "))
-        parties_with_matching_birthdays = 0
-
-        for party in range( parties ):
-            party = Party( partiers )
-            if party.matching_dates:
-                parties_with_matching_birthdays += 1
+        parties  = float(input("Number of parties (or target precision):  "))
+        partiers = input("Number of partiers (or 'all'): ").strip()
+        if partiers.lower() == 'all':
+            if parties < 1:
+                print( 'The curve needs a whole number of parties (at least 1).' )
+                continue
+            curve = match_probability_curve( int( parties ) )
+            print_curve( curve )
+            path = input("Save curve as CSV (blank to skip): ").strip()
+            if path:
+                write_curve_csv( curve, path )
+            continue
+        partiers = int( partiers )
+        if parties <= 0:
+            print( 'Enter a positive number of parties or target precision.' )
+            continue
+        if parties < 1:
+            fraction, low, high, trials = simulate_to_precision( partiers, parties, engine )
+            print( 'Fraction of parties having at least one match:' )
+            print( '   ', fraction, f'(95% interval {low:.6f} to {high:.6f}, {trials} parties)' )
+            continue
+        parties = int( parties )
+        parties_with_matching_birthdays = ENGINES[engine]( parties, partiers )
 
         print( 'Fraction of parties having at least one match:' )
         print( '   ', parties_with_matching_birthdays / parties )
 
-main()
\ No newline at end of file
+# Run with no arguments for the interactive prompts, or e.g.
+#   python birthday.py --parties 1000000 --partiers 23 --seed 1 --format json
+#   python birthday.py --bench
+
+def cli( argv=None ):
+    parser = argparse.ArgumentParser( description='Birthday problem simulator.' )
+    parser.add_argument( '--parties', type=int, help='number of parties to simulate' )
+    parser.add_argument( '--partiers', type=int, default=23, help='people per party (default 23)' )
+    parser.add_argument( '--seed', type=int, help='seed for reproducible results' )
+    parser.add_argument( '--engine', choices=sorted( ENGINES ), default=DEFAULT_ENGINE )
+    parser.add_argument( '--workers', type=int, help='worker processes for the parallel engine' )
+    parser.add_argument( '--format', choices=[ 'text', 'json', 'csv' ], default='text' )
+    parser.add_argument( '--bench', action='store_true', help='time every engine on the same problem' )
+    args = parser.parse_args( argv )
+
+    if args.bench:
+        results = bench( args.parties or 20000, args.partiers, seed=args.seed or 0 )
+        if args.format == 'text':
+            print_bench( results )
+        else:
+            write_results( results, args.format )
+    elif args.parties is None:
+        main( args.engine )
+    else:
+        write_results( [ simulate( args.parties, args.partiers, args.engine, args.seed, args.workers ) ], args.format )
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,64 @@
+import time
+import argparse
+import numpy as np
+from fractal_engine import BACKENDS, complex_grid, escape_time, warm_up
+
+# Benchmark for the interior shortcuts in fractal_engine. Each view is
+# rendered with every backend and every combination of the cardioid/bulb
+# test and the periodicity check, and the fastest of --repeat runs is
+# reported next to its speedup over the plain kernel and the number of
+# pixels whose count differs from it (which should always be 0).
+
+# name -> (xs, ys, max_iter); the first three are the scripts' default views
+VIEWS = {
+    # the viewer's opening screen: -2.5..1.5 x -1.5..1.5 with square pixels, 3/768 wide
+    'mandelrbrot': ((np.arange(1024) - 640) * (3 / 768), (np.arange(768) - 384) * (3 / 768), 257),
+    'patterns/mandelbrot': (np.linspace(-2, 1, 800), np.linspace(-1.5, 1.5, 600), 100),
+    'patterns/fractal': ((np.arange(1024) - 768) / 256, (np.arange(512) - 256) / 256, 999),
+    'seahorse': (np.linspace(-0.75, -0.74, 400), np.linspace(0.1, 0.11, 400), 2000),
+    'minibrot': (np.linspace(-1.7725, -1.7675, 400), np.linspace(-0.0025, 0.0025, 400), 3000),
+}
+DEFAULT_VIEWS = ['mandelrbrot', 'patterns/mandelbrot', 'patterns/fractal']
+
+# name -> escape_time() keyword arguments
+SHORTCUTS = {
+    'none': dict(cardioid=False, periodicity=False),
+    'cardioid': dict(cardioid=True, periodicity=False),
+    'periodicity': dict(cardioid=False, periodicity=True),
+    'both': dict(cardioid=True, periodicity=True),
+}
+
+def best_time(c, max_iter, backend, shortcuts, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = escape_time(c, max_iter, backend=backend, **shortcuts)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the escape-time interior shortcuts.')
+    parser.add_argument('--views', nargs='+', choices=list(VIEWS), default=DEFAULT_VIEWS, help='views to render')
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS), help='kernels to time')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per configuration; the fastest is kept')
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        warm_up(backend)
+
+    print(f"{'view':<20} {'backend':<8} {'shortcuts':<12} {'seconds':>9} {'speedup':>8} {'differ':>7}")
+    for view in args.views:
+        xs, ys, max_iter = VIEWS[view]
+        c = complex_grid(xs, ys)
+        for backend in args.backends:
+            baseline = None
+            for name, shortcuts in SHORTCUTS.items():
+                seconds, counts = best_time(c, max_iter, backend, shortcuts, args.repeat)
+                if baseline is None:
+                    baseline = (seconds, counts)
+                differ = int(np.count_nonzero(counts != baseline[1]))
+                print(f"{view:<20} {backend:<8} {name:<12} {seconds:>9.3f} {baseline[0] / seconds:>7.1f}x {differ:>7}")
+
+if __name__ == '__main__':
+    main()
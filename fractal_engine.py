@@ -0,0 +1,206 @@
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Shared escape-time engine for the Mandelbrot scripts (mandelrbrot.py and
+# .vscode/patterns/mandelbrot.py, fractal.py).
+#
+# escape_time() iterates z = z*z + c from z = 0 for a whole grid of points
+# at once and returns, per point, the first step n at which |z_n| > 2, or
+# max_iter if the point has not escaped by then. Escaped points are dropped
+# from the working arrays as soon as they escape, so each step only costs
+# work for the points that are still active.
+#
+# With numba installed, backend='numba' runs a compiled kernel instead: the
+# points (flattened, so a scattered subset parallelises as well as a full
+# grid) are spread across all cores with prange, each is iterated in
+# registers and written straight into the preallocated buffer. The compiled
+# code is cached to disk (__pycache__), so only the first run pays for the
+# JIT.
+#
+# Points inside the set are the expensive ones: they run all max_iter steps.
+# Both kernels have two shortcuts for them, each switchable per call:
+#   cardioid     points in the main cardioid or the period-2 bulb are known
+#                to be inside and are never iterated;
+#   periodicity  Brent-style cycle check: z is saved at steps 1, 2, 4, 8, ...
+#                and a point whose orbit comes back within PERIOD_EPS of the
+#                saved value has settled into a cycle and stops early.
+# Either way such points get max_iter, as if they had run to the limit.
+# The cardioid test is on by default. The cycle check costs a little on
+# every step, so it is off by default: it pays off when much of the interior
+# lies outside the cardioid and bulb, e.g. around the minibrots.
+
+PERIOD_EPS = 1e-12
+
+def complex_grid(xs, ys):
+    """Grid of complex points with shape (len(ys), len(xs)): row y, column x."""
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    return xs[np.newaxis, :] + 1j * ys[:, np.newaxis]
+
+def escape_time(c, max_iter, out=None, backend='numpy', cardioid=True, periodicity=False):
+    """Escape step per point of c (any shape) as an int32 array; max_iter for points that never escape.
+
+    A given out must be a C-contiguous int32 array shaped like c; it is filled and returned.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}; available: {', '.join(BACKENDS)}")
+    c = np.asarray(c, dtype=np.complex128)
+    if out is None:
+        out = np.empty(c.shape, dtype=np.int32)
+    elif not isinstance(out, np.ndarray) or out.dtype != np.int32 or out.shape != c.shape or not out.flags.c_contiguous:
+        # The kernels write through out.reshape(-1), which is a copy for anything else.
+        raise ValueError('out must be a C-contiguous int32 array with the shape of c')
+    return BACKENDS[backend](c, max_iter, out, cardioid, periodicity)
+
+def in_cardioid_or_bulb(cr, ci):
+    """True where c = cr + ci*i lies in the main cardioid or the period-2 bulb."""
+    q = (cr - 0.25) * (cr - 0.25) + ci * ci
+    return (q * (q + (cr - 0.25)) <= 0.25 * ci * ci) | ((cr + 1.0) * (cr + 1.0) + ci * ci <= 0.0625)
+
+def warm_up(backend):
+    """Load (or compile) a backend's kernel and start its thread pool on the calling thread.
+
+    Call this from the main thread before using the numba backend from
+    worker threads: numba's default thread pool hangs the interpreter at
+    exit if it was first started from another thread.
+    """
+    escape_time(np.zeros(1, dtype=np.complex128), 1, backend=backend)
+
+def _escape_time_numpy(c, max_iter, out, cardioid, periodicity):
+    out.fill(max_iter)
+    counts = out.reshape(-1)
+
+    # Real and imaginary parts are kept separately: NumPy's vectorised
+    # complex multiply can round differently from scalar arithmetic, which
+    # would change the counts of boundary points between backends.
+    active = np.arange(c.size)
+    cr = c.real.reshape(-1).copy()
+    ci = c.imag.reshape(-1).copy()
+    if cardioid:
+        outside = ~in_cardioid_or_bulb(cr, ci)
+        active, cr, ci = active[outside], cr[outside], ci[outside]
+    zr = np.zeros_like(cr)
+    zi = np.zeros_like(ci)
+    # Saved orbit values for the cycle check, replaced at steps 1, 2, 4, ...
+    sr = np.zeros_like(cr)
+    si = np.zeros_like(ci)
+    save_at = 1
+    for n in range(1, max_iter + 1):
+        if not active.size:
+            break
+        zr2 = zr * zr
+        zi2 = zi * zi
+        zi *= zr
+        zi *= 2.0
+        zi += ci
+        np.subtract(zr2, zi2, out=zr)
+        zr += cr
+        done = zr * zr + zi * zi > 4.0
+        if done.any():
+            counts[active[done]] = n
+        if periodicity:
+            dr = zr - sr
+            di = zi - si
+            done |= dr * dr + di * di < PERIOD_EPS * PERIOD_EPS
+        if done.any():
+            still = ~done
+            active, cr, ci, zr, zi = active[still], cr[still], ci[still], zr[still], zi[still]
+            if periodicity:
+                sr, si = sr[still], si[still]
+        if periodicity and n == save_at:
+            sr = zr.copy()
+            si = zi.copy()
+            save_at *= 2
+    return out
+
+def _escape_time_numba(c, max_iter, out, cardioid, periodicity):
+    _numba_kernel(c.reshape(-1), max_iter, out.reshape(-1), cardioid, periodicity)
+    return out
+
+# Mariani-Silver subdivision: evaluate only the border of a rectangle; if
+# every border pixel has the same count, fill the rectangle with it,
+# otherwise split it in four (the children share the split lines, which are
+# evaluated once) and repeat. Rectangles of at most min_size pixels across are
+# evaluated in full. All the rectangles of one round are evaluated together
+# in a single escape_time() call.
+#
+# The Mandelbrot set is connected and has no holes, so a rectangle whose
+# border lies inside the set (count max_iter) is inside it throughout, and
+# one whose border lies in a single escape band contains no part of the set.
+# On a pixel grid that holds up to sampling: a filament thinner than the
+# pixel spacing can slip between border samples, which the default views
+# never hit but deep zooms occasionally do.
+
+SUBDIVIDE_MIN = 8
+
+def escape_time_subdivided(c, max_iter, backend='numpy', min_size=SUBDIVIDE_MIN, cardioid=True, periodicity=False):
+    """escape_time() for a 2-D grid by rectangle subdivision; returns (counts, pixels evaluated)."""
+    c = np.asarray(c, dtype=np.complex128)
+    if c.ndim != 2:
+        raise ValueError('subdivision needs a 2-D grid of points')
+    min_size = max(min_size, 3)
+    out = np.full(c.shape, -1, dtype=np.int32)
+    evaluated = 0
+    rects = [(0, c.shape[0], 0, c.shape[1])]
+    while rects:
+        todo = np.zeros(c.shape, dtype=bool)
+        for y0, y1, x0, x1 in rects:
+            if y1 - y0 <= min_size or x1 - x0 <= min_size:
+                todo[y0:y1, x0:x1] = True
+            else:
+                todo[(y0, y1 - 1), x0:x1] = True
+                todo[y0:y1, (x0, x1 - 1)] = True
+        todo &= out < 0
+        evaluated += int(np.count_nonzero(todo))
+        out[todo] = escape_time(c[todo], max_iter, backend=backend, cardioid=cardioid, periodicity=periodicity)
+
+        split = []
+        for y0, y1, x0, x1 in rects:
+            if y1 - y0 <= min_size or x1 - x0 <= min_size:
+                continue
+            first = out[y0, x0]
+            if ((out[(y0, y1 - 1), x0:x1] == first).all() and (out[y0:y1, (x0, x1 - 1)] == first).all()):
+                out[y0 + 1:y1 - 1, x0 + 1:x1 - 1] = first
+                continue
+            ym, xm = (y0 + y1) // 2, (x0 + x1) // 2
+            split += [(y0, ym + 1, x0, xm + 1), (y0, ym + 1, xm, x1), (ym, y1, x0, xm + 1), (ym, y1, xm, x1)]
+        rects = split
+    return out, evaluated
+
+BACKENDS = {'numpy': _escape_time_numpy}
+
+if njit is not None:
+    @njit(parallel=True, cache=True, nogil=True)
+    def _numba_kernel(c, max_iter, out, cardioid, periodicity):
+        eps2 = PERIOD_EPS * PERIOD_EPS
+        for i in prange(c.shape[0]):
+            cr = c[i].real
+            ci = c[i].imag
+            out[i] = max_iter
+            if cardioid:
+                q = (cr - 0.25) * (cr - 0.25) + ci * ci
+                if q * (q + (cr - 0.25)) <= 0.25 * ci * ci or (cr + 1.0) * (cr + 1.0) + ci * ci <= 0.0625:
+                    continue
+            zr = 0.0
+            zi = 0.0
+            sr = 0.0
+            si = 0.0
+            save_at = 1
+            for k in range(1, max_iter + 1):
+                zr, zi = zr * zr - zi * zi + cr, 2.0 * zr * zi + ci
+                if zr * zr + zi * zi > 4.0:
+                    out[i] = k
+                    break
+                if periodicity:
+                    if (zr - sr) * (zr - sr) + (zi - si) * (zi - si) < eps2:
+                        break
+                    if k == save_at:
+                        sr = zr
+                        si = zi
+                        save_at *= 2
+
+    BACKENDS['numba'] = _escape_time_numba
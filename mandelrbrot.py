@@ -1,6 +1,11 @@
+import os
 import pygame
 import random
+import argparse
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fractal_engine import BACKENDS, complex_grid, escape_time, escape_time_subdivided, warm_up
 
 # Initialize Pygame
 pygame.init()
@@ -12,39 +17,217 @@ pygame.display.set_caption("Mandelbrot Set")
 
 # Mandelbrot parameters
 max_iter = 256
+backend = 'numpy'
+subdivide = False
+cardioid = True
+periodicity = False
 
-def mandelbrot(c, max_iter):
-    z = c
-    for n in range(max_iter):
-        if abs(z) > 2:
-            return n
-        z = z*z + c
-    return max_iter
-
-def draw_mandelbrot():
-    for x in range(width):
-        for y in range(height):
-            # Convert pixel coordinate to complex number
-            c = complex(-2 + (x / width) * 3, -1.5 + (y / height) * 3)
-            m = mandelbrot(c, max_iter)
-            color = (m % 8 * 32, m % 16 * 16, m % 32 * 8)
-            screen.set_at((x, y), color)
+# The view is drawn from square tiles of TILE x TILE pixels. At zoom level z
+# a pixel is BASE_SCALE / 2**z wide, and tile (tx, ty) covers the global
+# pixels tx*TILE.. and ty*TILE.., so pixel (px, py) is the point
+# (px + py*i) * scale. Tiles are cached by (zoom, tx, ty, max_iter) within
+# TILE_CACHE_BYTES, and the missing ones are computed in the background.
+TILE = 256
+TILE_CACHE_BYTES = 256 * 1024 * 1024
+BASE_SCALE = 3 / height
+PENDING_COLOR = (40, 40, 40)
+MAX_ITER_STEP = 64
+
+def make_palette(max_iter):
+    n = np.arange(max_iter + 1)
+    return np.stack([n % 8 * 32, n % 16 * 16, n % 32 * 8], axis=-1).astype(np.uint8)
+
+def tile_grid(zoom, tx, ty):
+    """Points of one tile in (x, y) order, the layout pygame.surfarray uses."""
+    scale = BASE_SCALE / 2 ** zoom
+    xs = (tx * TILE + np.arange(TILE)) * scale
+    ys = (ty * TILE + np.arange(TILE)) * scale
+    return np.ascontiguousarray(complex_grid(xs, ys).T)
+
+def compute_tile(zoom, tx, ty, max_iter, steps=None, cap=0):
+    # (escape steps, pixels evaluated) for a tile computed with a cap of
+    # max_iter + 1. Given the steps of the same tile at a lower cap, only the
+    # pixels that hit that cap are recomputed.
+    grid = tile_grid(zoom, tx, ty)
+    if steps is None:
+        if subdivide:
+            return escape_time_subdivided(grid, max_iter + 1, backend, cardioid=cardioid, periodicity=periodicity)
+        return escape_time(grid, max_iter + 1, backend=backend, cardioid=cardioid, periodicity=periodicity), grid.size
+    steps = steps.copy()
+    capped = steps == cap
+    steps[capped] = escape_time(grid[capped], max_iter + 1, backend=backend, cardioid=cardioid, periodicity=periodicity)
+    return steps, int(np.count_nonzero(capped))
+
+def tile_counts(steps, max_iter):
+    return np.where(steps <= max_iter, steps - 1, max_iter)
+
+class TileCache:
+    """LRU cache of tile steps, evicting the least recently used tiles beyond `budget` bytes."""
+
+    def __init__(self, budget=TILE_CACHE_BYTES):
+        self.budget = budget
+        self.bytes = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        steps = self.entries.get(key)
+        if steps is not None:
+            self.entries.move_to_end(key)
+        return steps
+
+    def put(self, key, steps):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.nbytes
+        self.entries[key] = steps
+        self.bytes += steps.nbytes
+        while self.bytes > self.budget and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+
+    def best(self, zoom, tx, ty):
+        """The cached (max_iter, steps) of a tile with the highest max_iter, or None."""
+        found = None
+        for (z, x, y, m), steps in self.entries.items():
+            if (z, x, y) == (zoom, tx, ty) and (found is None or m > found[0]):
+                found = (m, steps)
+        return found
+
+class Viewer:
+    def __init__(self, screen, max_iter):
+        self.screen = screen
+        self.max_iter = max_iter
+        self.zoom = 0
+        # Global pixel at the top-left corner; starts on -2.5..1.5 x -1.5..1.5
+        self.ox = round(-2.5 / BASE_SCALE)
+        self.oy = round(-1.5 / BASE_SCALE)
+        self.cache = TileCache()
+        self.pending = {}
+        # Pixels actually iterated, against the pixels of the tiles computed
+        self.evaluated = 0
+        self.computed = 0
+        warm_up(backend)
+        # The numba kernel already uses every core, so it gets one worker.
+        workers = 1 if backend == 'numba' else os.cpu_count()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.dirty = True
+
+    def visible_tiles(self):
+        w, h = self.screen.get_size()
+        for ty in range(self.oy // TILE, (self.oy + h - 1) // TILE + 1):
+            for tx in range(self.ox // TILE, (self.ox + w - 1) // TILE + 1):
+                yield self.zoom, tx, ty, self.max_iter
+
+    def tile(self, key):
+        """Steps for a tile if they are ready; otherwise schedules it and returns None."""
+        steps = self.cache.get(key)
+        if steps is not None or key in self.pending:
+            return steps
+        best = self.cache.best(*key[:3])
+        if best is not None and best[0] >= key[3]:
+            # Steps computed to a higher cap are exact for a lower max_iter.
+            self.cache.put(key, best[1])
+            return best[1]
+        refine = (best[1], best[0] + 1) if best is not None else ()
+        self.pending[key] = self.executor.submit(compute_tile, *key, *refine)
+        return None
+
+    def collect(self):
+        for key, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[key]
+                if not future.cancelled():
+                    steps, evaluated = future.result()
+                    self.cache.put(key, steps)
+                    self.evaluated += evaluated
+                    self.computed += steps.size
+                    self.dirty = True
+
+    def draw(self):
+        palette = make_palette(self.max_iter)
+        visible = set()
+        for key in self.visible_tiles():
+            visible.add(key)
+            x, y = key[1] * TILE - self.ox, key[2] * TILE - self.oy
+            steps = self.tile(key)
+            if steps is None:
+                self.screen.fill(PENDING_COLOR, (x, y, TILE, TILE))
+            else:
+                self.screen.blit(pygame.surfarray.make_surface(palette[tile_counts(steps, self.max_iter)]), (x, y))
+        # Tiles that scrolled out of view before starting are dropped.
+        for key, future in list(self.pending.items()):
+            if key not in visible and future.cancel():
+                del self.pending[key]
+        self.dirty = False
+
+    def zoom_at(self, mx, my, levels):
+        for _ in range(abs(levels)):
+            if levels > 0:
+                self.ox, self.oy = (self.ox + mx) * 2 - mx, (self.oy + my) * 2 - my
+                self.zoom += 1
+            else:
+                self.ox, self.oy = (self.ox + mx) // 2 - mx, (self.oy + my) // 2 - my
+                self.zoom -= 1
+        self.dirty = True
+
+    def pan(self, dx, dy):
+        self.ox -= dx
+        self.oy -= dy
+        self.dirty = True
+
+    def set_max_iter(self, max_iter):
+        self.max_iter = max(1, max_iter)
+        self.dirty = True
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
 def main():
+    global backend, subdivide, cardioid, periodicity
+    parser = argparse.ArgumentParser(description="Mandelbrot set viewer: wheel zooms, drag pans, +/- change max_iter, space picks a random one")
+    parser.add_argument('--backend', choices=list(BACKENDS), default=backend, help="escape-time kernel")
+    parser.add_argument('--subdivide', action='store_true', help="compute tiles by Mariani-Silver subdivision")
+    parser.add_argument('--no-cardioid', action='store_true', help="iterate points in the main cardioid and period-2 bulb too")
+    parser.add_argument('--periodicity', action='store_true', help="stop interior points early by cycle detection")
+    args = parser.parse_args()
+    backend, subdivide = args.backend, args.subdivide
+    cardioid, periodicity = not args.no_cardioid, args.periodicity
+
+    viewer = Viewer(screen, max_iter)
+    clock = pygame.time.Clock()
+    dragging = False
     running = True
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.MOUSEWHEEL:
+                viewer.zoom_at(*pygame.mouse.get_pos(), event.y)
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                dragging = True
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                dragging = False
+            elif event.type == pygame.MOUSEMOTION and dragging:
+                viewer.pan(*event.rel)
+            elif event.type == pygame.KEYDOWN:
+                if event.unicode in ('+', '='):
+                    viewer.set_max_iter(viewer.max_iter + MAX_ITER_STEP)
+                elif event.unicode == '-':
+                    viewer.set_max_iter(viewer.max_iter - MAX_ITER_STEP)
+                elif event.key == pygame.K_SPACE:
+                    # Randomize colors
+                    viewer.set_max_iter(random.randint(100, 256))
 
-        draw_mandelbrot()
-        pygame.display.flip()
-
-        # Randomize colors
-        global max_iter
-        max_iter = random.randint(100, 256)
+        viewer.collect()
+        if viewer.dirty:
+            viewer.draw()
+            pygame.display.flip()
+            if subdivide and viewer.computed:
+                pygame.display.set_caption(f"Mandelbrot Set - evaluated {viewer.evaluated:,} of {viewer.computed:,} pixels")
+        clock.tick(60)
 
+    viewer.close()
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,29 +1,769 @@
 import os
+import io
 import csv
+import gzip
+import mmap
+import queue
+import json
+import math
+import codecs
+import re
+import hashlib
+import shutil
+import argparse
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 
 #currentdirpath = os.getcwd()
 #filename = 'argos.csv'
 #file_path = os.path.join(os.getcwd(), filename) #filepath to open
 
+# How many partition files may be open at once, and how big each one's write
+# buffer is. Rows for a partition accumulate in its buffer and go to disk in
+# one write when the buffer fills or the handle is evicted.
+MAX_OPEN_FILES = 64
+WRITE_BUFFER_SIZE = 1 << 16
+# Quote counting while cutting byte ranges is done in slices of this size so
+# the scan never copies more than this much of the mapped file at once.
+SCAN_CHUNK_SIZE = 1 << 24
+
+OUTPUT_FORMATS = ('csv', 'arrow', 'parquet', 'npy')
+MANIFEST_NAME = 'manifest.json'
+SUMMARY_NAME = 'billing_summary.csv'
+CHECKPOINT_NAME = '.splitcsv-checkpoint.json'
+# Incremental runs commit (flush every partition and save the offset) after
+# this many rows. The first FINGERPRINT_BYTES of the input identify it; an
+# append-only export keeps the same prefix from run to run.
+CHECKPOINT_ROWS = 1000000
+FINGERPRINT_BYTES = 1 << 20
+# Arrow, Parquet and npy output only store a column as numbers if every value
+# in the whole export is one: integers of up to 18 digits become int64, and
+# anything else float() reads (exponents and long fractions included) makes
+# the column float64. Values with a leading zero (billing numbers such as
+# 0012345) and longer integers are IDs, not numbers, and keep the column as
+# strings. Blank values are allowed and become nulls (NaN in npy).
+INTEGER_TEXT = re.compile(r'-?(?:0|[1-9][0-9]{0,17})')
+LEADING_ZERO = re.compile(r'-?0[0-9]')
+TYPE_ORDER = ('blank', 'int', 'float', 'str')
+# Rows parsed per chunk in aggregate mode; memory use is bounded by this and
+# the number of distinct billing numbers, not by the size of the input.
+AGGREGATE_CHUNK_ROWS = 100000
+DATE_FORMATS = ('%m/%d/%Y', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%m/%d/%Y %H:%M:%S')
+
+# Compressed input is recognised by magic bytes (or extension) and inflated on
+# a background thread, DECOMPRESS_QUEUE_DEPTH chunks of DECOMPRESS_CHUNK_SIZE
+# ahead of the parser.
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+DECOMPRESS_CHUNK_SIZE = 1 << 20
+DECOMPRESS_QUEUE_DEPTH = 8
+
 def get_file_path(filename):
     ''' - This gets the full path...file and terminal need  to be in same directory - '''
     file_path = os.path.join(os.getcwd(), filename)
     return file_path
 
-pathOfFile = get_file_path('azurecosts.csv')
-''' - Below opens and reads the csv file, then going to try to loop and write the rows out in files sorted by Billing Number - '''
-with open(pathOfFile, 'rU') as csvfile:
-    reader = csv.reader(csvfile)
-    header = next(reader)
-    for row in reader:
-        new_file_name = row[5][:5] + '.csv'
-    ''' Create file named by billing number, and print the header to each file '''
-    fb = open(new_file_name, 'w+')
-    fb.write(str(header) + '\n')
-    #fb.close()
-with open(pathOfFile, 'rU') as csvfile:
-    reader = csv.reader(csvfile)
-    for row in reader:
-        new_file_name = row[5][:5] + '.csv'
-        ab = open(new_file_name, 'a')
-        ab.write(str(row) + '\n')
\ No newline at end of file
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError('zstandard is needed for .zst files: pip install zstandard') from None
+    return zstandard
+
+class ThreadedReader(io.RawIOBase):
+    ''' - Raw stream that reads `source` on a background thread, so decompression overlaps parsing - '''
+
+    def __init__(self, source, chunk_size=DECOMPRESS_CHUNK_SIZE, depth=DECOMPRESS_QUEUE_DEPTH):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.chunks = queue.Queue(depth)
+        self.pending = memoryview(b'')
+        self.eof = False
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._fill, daemon=True)
+        self.thread.start()
+
+    def _fill(self):
+        try:
+            while not self.stopping.is_set():
+                data = self.source.read(self.chunk_size)
+                self.chunks.put(data)
+                if not data:
+                    break
+        except BaseException as exc:
+            self.chunks.put(exc)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self.pending:
+            if self.eof:
+                return 0
+            data = self.chunks.get()
+            if isinstance(data, BaseException):
+                raise data
+            if not data:
+                self.eof = True
+                return 0
+            self.pending = memoryview(data)
+        n = min(len(b), len(self.pending))
+        b[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self.stopping.set()
+            # Unblock the reader thread if it is waiting on a full queue.
+            while self.thread.is_alive():
+                try:
+                    self.chunks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self.source.close()
+        super().close()
+
+def input_compression(path):
+    ''' - 'gzip', 'zstd' or None, judged by the file's magic bytes and then its extension - '''
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC) or path.endswith('.gz'):
+        return 'gzip'
+    if magic == ZSTD_MAGIC or path.endswith('.zst'):
+        return 'zstd'
+    return None
+
+def open_input(path):
+    ''' - Open the export for binary reading, stream-decompressing gzip/zstd input on a background thread - '''
+    compression = input_compression(path)
+    if compression is None:
+        return open(path, 'rb')
+    if compression == 'gzip':
+        source = gzip.open(path, 'rb')
+    else:
+        source = _zstandard().ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+    return io.BufferedReader(ThreadedReader(source), DECOMPRESS_CHUNK_SIZE)
+
+def open_output(path, mode, compression=None):
+    ''' - Open a partition for text writing ('w' or 'a'), compressed as asked.
+
+    Appending to a compressed partition starts a new gzip member / zstd
+    frame; both formats read concatenated members back as one stream.
+    '''
+    if compression is None:
+        return open(path, mode, encoding='utf-8', newline='', buffering=WRITE_BUFFER_SIZE)
+    if compression == 'gzip':
+        raw = gzip.GzipFile(path, mode + 'b')
+    else:
+        raw = _zstandard().ZstdCompressor().stream_writer(open(path, mode + 'b'), closefd=True)
+    return io.TextIOWrapper(io.BufferedWriter(raw, WRITE_BUFFER_SIZE), encoding='utf-8', newline='')
+
+def compress_bytes(data, compression=None):
+    if compression is None:
+        return data
+    if compression == 'gzip':
+        return gzip.compress(data)
+    return _zstandard().ZstdCompressor().compress(data)
+
+def partition_file(out_dir, key, compression=None):
+    return os.path.join(out_dir, key + '.csv' + COMPRESSION_SUFFIXES.get(compression, ''))
+
+def billing_key(row):
+    ''' - Partition key for a row: the first five characters of the Billing Number column - '''
+    return row[5][:5]
+
+def find_date_column(header):
+    ''' - Index of the first header whose name contains "date", or None - '''
+    for i, name in enumerate(header):
+        if 'date' in name.lower():
+            return i
+    return None
+
+def _parse_date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+class PartitionStats:
+    ''' - Row count and min/max date per partition, gathered while the rows stream past - '''
+
+    def __init__(self, date_column=None):
+        self.date_column = date_column
+        self.partitions = {}
+        # Exports repeat the same few dates millions of times, so each raw
+        # value is parsed once.
+        self._dates = {}
+
+    def add(self, key, row):
+        entry = self.partitions.get(key)
+        if entry is None:
+            entry = self.partitions[key] = [0, None, None]
+        entry[0] += 1
+        if self.date_column is None or self.date_column >= len(row):
+            return
+        raw = row[self.date_column]
+        date = self._dates.get(raw)
+        if date is None and raw not in self._dates:
+            date = self._dates[raw] = _parse_date(raw)
+        if date is not None:
+            if entry[1] is None or date < entry[1]:
+                entry[1] = date
+            if entry[2] is None or date > entry[2]:
+                entry[2] = date
+
+    def merge(self, partitions):
+        ''' - Fold in the partitions dict of another PartitionStats - '''
+        for key, (rows, low, high) in partitions.items():
+            entry = self.partitions.setdefault(key, [0, None, None])
+            entry[0] += rows
+            if low is not None and (entry[1] is None or low < entry[1]):
+                entry[1] = low
+            if high is not None and (entry[2] is None or high > entry[2]):
+                entry[2] = high
+
+class PartitionWriterPool:
+    ''' - Bounded pool of open csv.writer handles, one per partition, evicted least recently used first - '''
+
+    def __init__(self, out_dir, header=None, max_open=MAX_OPEN_FILES, compression=None):
+        self.out_dir = out_dir
+        self.header = header
+        self.max_open = max_open
+        self.compression = compression
+        self.handles = OrderedDict()
+        self.created = set()
+
+    def partition_path(self, key):
+        return partition_file(self.out_dir, key, self.compression)
+
+    def writer(self, key):
+        ''' - Return the writer for key, opening (and evicting) as needed - '''
+        entry = self.handles.get(key)
+        if entry is not None:
+            self.handles.move_to_end(key)
+            return entry[1]
+        if len(self.handles) >= self.max_open:
+            _, (old_file, _) = self.handles.popitem(last=False)
+            old_file.close()
+        # The first time a partition is seen in this run it is truncated and
+        # gets the header; after an eviction it is reopened for append.
+        if key in self.created:
+            fh = open_output(self.partition_path(key), 'a', self.compression)
+            writer = csv.writer(fh)
+        else:
+            fh = open_output(self.partition_path(key), 'w', self.compression)
+            writer = csv.writer(fh)
+            if self.header is not None:
+                writer.writerow(self.header)
+            self.created.add(key)
+        self.handles[key] = (fh, writer)
+        return writer
+
+    def write(self, key, row):
+        self.writer(key).writerow(row)
+
+    def close(self):
+        while self.handles:
+            _, (fh, _) = self.handles.popitem(last=False)
+            fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class RangeReader:
+    ''' - Iterate the decoded lines of a binary file between two byte offsets, tracking the current offset - '''
+
+    def __init__(self, f, start=0, end=None, position=0):
+        # Decompressed input cannot seek; it is read forward from `position`
+        # (where the stream currently is) to `start` instead.
+        if f.seekable():
+            f.seek(start)
+        else:
+            while position < start:
+                skipped = len(f.read(min(start - position, DECOMPRESS_CHUNK_SIZE)))
+                if not skipped:
+                    break
+                position += skipped
+        self.f = f
+        self.offset = start
+        self.end = end
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.end is not None and self.offset >= self.end:
+            raise StopIteration
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        if self.offset == 0 and line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8):]
+            self.offset += len(codecs.BOM_UTF8)
+        self.offset += len(line)
+        return line.decode('utf-8')
+
+def read_header(f):
+    ''' - Parse the header row of a binary csv file, returning it with the offset of the first data row - '''
+    lines = RangeReader(f)
+    header = next(csv.reader(lines))
+    return header, lines.offset
+
+def _count_quotes(mm, start, end):
+    count = 0
+    for pos in range(start, end, SCAN_CHUNK_SIZE):
+        count += mm[pos:min(pos + SCAN_CHUNK_SIZE, end)].count(b'"')
+    return count
+
+def find_ranges(mm, data_start, parts):
+    ''' - Cut mm[data_start:] into about `parts` byte ranges that each begin at the start of a csv record.
+
+    A newline only ends a record when an even number of quote characters came
+    before it, so the quote parity is carried along as the cut points move
+    forward. The whole scan is a single pass over the file.
+    '''
+    size = len(mm)
+    bounds = [data_start]
+    pos = data_start
+    inside = False
+    for i in range(1, parts):
+        target = data_start + (size - data_start) * i // parts
+        if target <= pos:
+            continue
+        inside ^= bool(_count_quotes(mm, pos, target) & 1)
+        pos = target
+        while True:
+            nl = mm.find(b'\n', pos)
+            if nl == -1:
+                pos = size
+                break
+            inside ^= bool(_count_quotes(mm, pos, nl) & 1)
+            pos = nl + 1
+            if not inside:
+                break
+        if pos >= size:
+            break
+        bounds.append(pos)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+def _split_range(path, start, end, shard_dir, max_open, date_column, compression):
+    ''' - Worker: partition the records in one byte range into header-less shard files - '''
+    stats = PartitionStats(date_column)
+    with open(path, 'rb') as f:
+        with PartitionWriterPool(shard_dir, None, max_open, compression) as pool:
+            for row in csv.reader(RangeReader(f, start, end)):
+                key = billing_key(row)
+                pool.write(key, row)
+                stats.add(key, row)
+    return stats.partitions
+
+def _header_bytes(header):
+    buf = io.StringIO()
+    csv.writer(buf).writerow(header)
+    return buf.getvalue().encode('utf-8')
+
+def split_parallel(path, out_dir='.', workers=None, max_open=MAX_OPEN_FILES, stats=None, compression=None):
+    ''' - Split the csv across worker processes, producing the same files as split_stream.
+
+    Each worker partitions one byte range into its own shard directory; the
+    shards are then concatenated in range order behind a single header, so
+    every partition keeps the row order of the input. Compressed shards are
+    concatenated as-is (one gzip member / zstd frame each), so compression
+    runs in the workers too. The input itself must be uncompressed.
+    '''
+    workers = workers or os.cpu_count() or 1
+    with open(path, 'rb') as f:
+        header, data_start = read_header(f)
+        if stats is not None and stats.date_column is None:
+            stats.date_column = find_date_column(header)
+        if os.fstat(f.fileno()).st_size <= data_start:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ranges = find_ranges(mm, data_start, workers)
+
+    shard_root = tempfile.mkdtemp(prefix='.splitcsv-', dir=out_dir)
+    try:
+        shard_dirs = []
+        for i in range(len(ranges)):
+            shard_dirs.append(os.path.join(shard_root, '%04d' % i))
+            os.mkdir(shard_dirs[-1])
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            date_column = stats.date_column if stats is not None else None
+            futures = [executor.submit(_split_range, path, start, end, shard_dir, max_open, date_column, compression)
+                       for (start, end), shard_dir in zip(ranges, shard_dirs)]
+            shard_stats = [future.result() for future in futures]
+        shard_keys = [set(partitions) for partitions in shard_stats]
+        if stats is not None:
+            for partitions in shard_stats:
+                stats.merge(partitions)
+
+        header_line = compress_bytes(_header_bytes(header), compression)
+        keys = sorted(set().union(*shard_keys))
+        for key in keys:
+            with open(partition_file(out_dir, key, compression), 'wb') as out:
+                out.write(header_line)
+                for shard_dir, present in zip(shard_dirs, shard_keys):
+                    if key in present:
+                        with open(partition_file(shard_dir, key, compression), 'rb') as shard:
+                            shutil.copyfileobj(shard, out, WRITE_BUFFER_SIZE)
+        return keys
+    finally:
+        shutil.rmtree(shard_root, ignore_errors=True)
+
+def split_stream(path, out_dir='.', max_open=MAX_OPEN_FILES, stats=None, compression=None):
+    ''' - Single pass over the csv, writing each row to the file named by its billing number - '''
+    with io.TextIOWrapper(open_input(path), encoding='utf-8-sig', newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        if stats is not None and stats.date_column is None:
+            stats.date_column = find_date_column(header)
+        with PartitionWriterPool(out_dir, header, max_open, compression) as pool:
+            for row in reader:
+                key = billing_key(row)
+                pool.write(key, row)
+                if stats is not None:
+                    stats.add(key, row)
+            return sorted(pool.created)
+
+def _read_prefix(path, length=FINGERPRINT_BYTES):
+    with open_input(path) as f:
+        return f.read(length)
+
+def _fingerprint(prefix, length):
+    return hashlib.sha256(prefix[:length]).hexdigest()
+
+def load_checkpoint(path, out_dir, compression=None):
+    ''' - Return the saved checkpoint for path if it still describes the same (possibly grown) file, else None.
+
+    The checkpoint must also have been written with the same compression, and
+    every partition it lists must still exist at least as long as recorded.
+    '''
+    checkpoint_path = os.path.join(out_dir, CHECKPOINT_NAME)
+    try:
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get('input') != os.path.abspath(path):
+        return None
+    if input_compression(path) is None and os.path.getsize(path) < checkpoint['offset']:
+        return None
+    if _fingerprint(_read_prefix(path), checkpoint['fingerprint_bytes']) != checkpoint['fingerprint']:
+        return None
+    if checkpoint.get('compression') != compression:
+        return None
+    for key, size in checkpoint['partitions'].items():
+        partition_path = partition_file(out_dir, key, compression)
+        if not os.path.exists(partition_path) or os.path.getsize(partition_path) < size:
+            return None
+    return checkpoint
+
+def save_checkpoint(path, out_dir, prefix, offset, pool, stats):
+    ''' - Atomically record how far the input has been split and how long every partition is - '''
+    fingerprint_bytes = min(offset, FINGERPRINT_BYTES)
+    checkpoint = {
+        'input': os.path.abspath(path),
+        'offset': offset,
+        'fingerprint_bytes': fingerprint_bytes,
+        'fingerprint': _fingerprint(prefix, fingerprint_bytes),
+        'compression': pool.compression,
+        'partitions': {key: os.path.getsize(pool.partition_path(key)) for key in sorted(pool.created)},
+        'stats': stats.partitions,
+    }
+    checkpoint_path = os.path.join(out_dir, CHECKPOINT_NAME)
+    with open(checkpoint_path + '.tmp', 'w') as out:
+        json.dump(checkpoint, out)
+    os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+def split_incremental(path, out_dir='.', max_open=MAX_OPEN_FILES, stats=None, checkpoint_rows=CHECKPOINT_ROWS,
+                      compression=None):
+    ''' - Like split_stream, but only the rows added since the last run are split.
+
+    Every checkpoint_rows rows all partitions are flushed and the input offset
+    plus each partition's length is saved. A later run on the same export
+    seeks to that offset and appends; partitions are first cut back to their
+    checkpointed length, so rows written after the last commit of an
+    interrupted run are not duplicated. Offsets count uncompressed bytes, so
+    a compressed export is re-read (but not re-split) up to the offset.
+    '''
+    stats = stats if stats is not None else PartitionStats()
+    checkpoint = load_checkpoint(path, out_dir, compression)
+    prefix = _read_prefix(path)
+    with open_input(path) as f:
+        header, data_start = read_header(f)
+        if stats.date_column is None:
+            stats.date_column = find_date_column(header)
+        with PartitionWriterPool(out_dir, header, max_open, compression) as pool:
+            start = data_start
+            if checkpoint is not None:
+                start = checkpoint['offset']
+                stats.merge(checkpoint['stats'])
+                for key, size in checkpoint['partitions'].items():
+                    # load_checkpoint made sure the file exists; r+b never creates one.
+                    with open(pool.partition_path(key), 'r+b') as partition:
+                        partition.truncate(size)
+                    pool.created.add(key)
+            lines = RangeReader(f, start, position=data_start)
+            pending = 0
+            for row in csv.reader(lines):
+                key = billing_key(row)
+                pool.write(key, row)
+                stats.add(key, row)
+                pending += 1
+                if pending >= checkpoint_rows:
+                    pool.close()
+                    save_checkpoint(path, out_dir, prefix, lines.offset, pool, stats)
+                    pending = 0
+            pool.close()
+            save_checkpoint(path, out_dir, prefix, lines.offset, pool, stats)
+            return sorted(pool.created)
+
+def _value_type(value):
+    if INTEGER_TEXT.fullmatch(value):
+        return 'int'
+    if LEADING_ZERO.match(value) or value.lstrip('-').isdigit():
+        return 'str'
+    try:
+        number = float(value)
+    except ValueError:
+        return 'str'
+    # float() also takes padding, underscores, inf and nan; pyarrow does not.
+    if value != value.strip() or '_' in value or not math.isfinite(number):
+        return 'str'
+    return 'float'
+
+def column_types(csv_paths):
+    ''' - One type per column for all the partitions: 'int', 'float' or 'str' - '''
+    header, types = None, None
+    for csv_path in csv_paths:
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            if types is None:
+                types = ['blank'] * len(header)
+            for row in reader:
+                for i, value in enumerate(row[:len(types)]):
+                    if types[i] == 'str' or not value:
+                        continue
+                    # Each column takes the widest type of its values: int, then float, then str.
+                    types[i] = max(types[i], _value_type(value), key=TYPE_ORDER.index)
+    if header is None:
+        return {}
+    # A column that is blank everywhere is kept as (empty) strings.
+    return {name: 'str' if kind == 'blank' else kind for name, kind in zip(header, types)}
+
+def _to_arrow(csv_path, base, output_format, types):
+    import pyarrow
+    import pyarrow.csv
+    arrow_types = {'int': pyarrow.int64(), 'float': pyarrow.float64(), 'str': pyarrow.string()}
+    # Every partition is read with the export-wide types, so they all share one schema.
+    convert_options = pyarrow.csv.ConvertOptions(
+        column_types={name: arrow_types[kind] for name, kind in types.items()},
+        null_values=[''], strings_can_be_null=False)
+    table = pyarrow.csv.read_csv(csv_path, parse_options=pyarrow.csv.ParseOptions(newlines_in_values=True),
+                                 convert_options=convert_options)
+    if output_format == 'parquet':
+        import pyarrow.parquet
+        out_path = base + '.parquet'
+        pyarrow.parquet.write_table(table, out_path)
+    else:
+        import pyarrow.ipc
+        out_path = base + '.arrow'
+        with pyarrow.ipc.new_file(out_path, table.schema) as writer:
+            writer.write_table(table)
+    os.remove(csv_path)
+    return [out_path]
+
+def _to_npy(csv_path, base, types):
+    ''' - Save every numeric column (per column_types) as <key>/<column>.npy; the csv stays for everything else - '''
+    import numpy as np
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = list(zip(*reader)) or [()] * len(header)
+    os.makedirs(base, exist_ok=True)
+    files = [csv_path]
+    for name, values in zip(header, columns):
+        if types.get(name) not in ('int', 'float'):
+            continue
+        if types[name] == 'int' and all(values):
+            array = np.array(values, dtype=np.int64)
+        else:
+            array = np.array([value or 'nan' for value in values], dtype=np.float64)
+        safe_name = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in name)
+        out_path = os.path.join(base, safe_name + '.npy')
+        np.save(out_path, array)
+        files.append(out_path)
+    return files
+
+def convert_partitions(out_dir, keys, output_format, compression=None):
+    ''' - Rewrite each csv partition in output_format, returning {key: [files]}.
+
+    Arrow and Parquet need pyarrow; without it the numeric columns are saved
+    as .npy arrays instead.
+    '''
+    if output_format in ('arrow', 'parquet'):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print(f"pyarrow is not installed, writing numeric columns as .npy instead of {output_format}")
+            output_format = 'npy'
+    types = None
+    if output_format != 'csv':
+        types = column_types(os.path.join(out_dir, key + '.csv') for key in keys)
+    files = {}
+    for key in keys:
+        base = os.path.join(out_dir, key)
+        csv_path = base + '.csv'
+        if output_format == 'csv':
+            files[key] = [partition_file(out_dir, key, compression)]
+        elif output_format == 'npy':
+            files[key] = _to_npy(csv_path, base, types)
+        else:
+            files[key] = _to_arrow(csv_path, base, output_format, types)
+    return output_format, files
+
+def write_manifest(out_dir, output_format, files, stats):
+    ''' - Describe every partition (files, rows, bytes, date range) in out_dir/manifest.json - '''
+    partitions = []
+    for key in sorted(files):
+        rows, min_date, max_date = stats.partitions.get(key, (0, None, None))
+        partitions.append({
+            'key': key,
+            'files': [os.path.relpath(path, out_dir) for path in files[key]],
+            'rows': rows,
+            'bytes': sum(os.path.getsize(path) for path in files[key]),
+            'min_date': min_date,
+            'max_date': max_date,
+        })
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(manifest_path, 'w') as f:
+        json.dump({'format': output_format, 'partitions': partitions}, f, indent=2)
+    return manifest_path
+
+def find_value_columns(header):
+    ''' - Indexes of the cost columns (header names containing "cost") - '''
+    return [i for i, name in enumerate(header) if 'cost' in name.lower()]
+
+def aggregate(path, value_columns=None, chunk_rows=AGGREGATE_CHUNK_ROWS):
+    ''' - Roll the csv up per billing number without writing any partitions.
+
+    Rows are read in chunks of chunk_rows; each chunk's value columns are
+    converted to a float matrix in one go and folded into running per-key
+    sums, counts and min/max arrays. Blank values are ignored.
+    Returns (value column names, keys, counts, sums, mins, maxs).
+    '''
+    import numpy as np
+    with io.TextIOWrapper(open_input(path), encoding='utf-8-sig', newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        if value_columns is None:
+            columns = find_value_columns(header)
+        else:
+            columns = [header.index(name) if name in header else int(name) for name in value_columns]
+        if not columns:
+            raise ValueError('no value columns to aggregate; pass them with --value-column')
+        width = len(columns)
+
+        key_ids = {}
+        capacity = 256
+        counts = np.zeros(capacity, dtype=np.int64)
+        sums = np.zeros((capacity, width))
+        mins = np.full((capacity, width), np.nan)
+        maxs = np.full((capacity, width), np.nan)
+
+        while True:
+            rows = list(islice(reader, chunk_rows))
+            if not rows:
+                break
+            ids = np.fromiter((key_ids.setdefault(billing_key(row), len(key_ids)) for row in rows),
+                              dtype=np.int64, count=len(rows))
+            if len(key_ids) > capacity:
+                grow = max(capacity, len(key_ids) - capacity)
+                counts = np.concatenate([counts, np.zeros(grow, dtype=np.int64)])
+                sums = np.vstack([sums, np.zeros((grow, width))])
+                mins = np.vstack([mins, np.full((grow, width), np.nan)])
+                maxs = np.vstack([maxs, np.full((grow, width), np.nan)])
+                capacity += grow
+            values = np.array([[row[i] or 'nan' for i in columns] for row in rows], dtype=np.str_).astype(np.float64)
+
+            counts += np.bincount(ids, minlength=capacity)
+            for c in range(width):
+                sums[:, c] += np.bincount(ids, weights=np.nan_to_num(values[:, c]), minlength=capacity)
+            # Group the chunk by key so min/max become one reduceat per column.
+            order = np.argsort(ids, kind='stable')
+            sorted_ids = ids[order]
+            starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+            present = sorted_ids[starts]
+            grouped = values[order]
+            mins[present] = np.fmin(mins[present], np.fmin.reduceat(grouped, starts, axis=0))
+            maxs[present] = np.fmax(maxs[present], np.fmax.reduceat(grouped, starts, axis=0))
+
+    n = len(key_ids)
+    keys = list(key_ids)
+    return [header[i] for i in columns], keys, counts[:n], sums[:n], mins[:n], maxs[:n]
+
+def write_summary(summary_path, names, keys, counts, sums, mins, maxs):
+    ''' - One row per billing number: row count, then sum/min/max of each value column - '''
+    with open(summary_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['BillingNumber', 'Rows'] + [f'{name}_{stat}' for name in names for stat in ('sum', 'min', 'max')])
+        for i in sorted(range(len(keys)), key=keys.__getitem__):
+            values = []
+            for c in range(len(names)):
+                values += [sums[i, c], mins[i, c], maxs[i, c]]
+            writer.writerow([keys[i], int(counts[i])] + ['' if v != v else repr(float(v)) for v in values])
+    return summary_path
+
+def main():
+    parser = argparse.ArgumentParser(description='Split an Azure cost export into one csv per billing number.')
+    parser.add_argument('input', nargs='?', default='azurecosts.csv', help='csv to split (default: azurecosts.csv)')
+    parser.add_argument('-o', '--out-dir', default='.', help='directory for the partition files')
+    parser.add_argument('--max-open', type=int, default=MAX_OPEN_FILES, help='maximum partition files held open at once (per worker)')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='worker processes; more than 1 splits byte ranges in parallel')
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='csv', help='partition file format')
+    parser.add_argument('-a', '--aggregate', action='store_true', help=f'write per-billing-number totals to {SUMMARY_NAME} instead of splitting')
+    parser.add_argument('--value-column', action='append', help='column (name or index) to total in aggregate mode; default: every *cost* column')
+    parser.add_argument('-i', '--incremental', action='store_true', help=f'only split rows added since the last run, checkpointing progress in {CHECKPOINT_NAME}')
+    parser.add_argument('-z', '--compress', choices=sorted(COMPRESSION_SUFFIXES), help='compress the csv partitions (gzip or zstd input is always detected)')
+    args = parser.parse_args()
+    if args.incremental and (args.workers > 1 or args.format != 'csv'):
+        parser.error('--incremental appends to csv partitions and runs in a single process')
+    if args.compress and args.format != 'csv':
+        parser.error('--compress applies to csv partitions only')
+
+    pathOfFile = get_file_path(args.input)
+    os.makedirs(args.out_dir, exist_ok=True)
+    if args.aggregate:
+        summary = aggregate(pathOfFile, args.value_column)
+        summary_path = write_summary(os.path.join(args.out_dir, SUMMARY_NAME), *summary)
+        print(f"Wrote totals for {len(summary[1])} billing numbers to {summary_path}")
+        return
+    stats = PartitionStats()
+    if args.workers > 1 and input_compression(pathOfFile) is not None:
+        print("Compressed input cannot be cut into byte ranges, splitting in a single process")
+        args.workers = 1
+    if args.incremental:
+        keys = split_incremental(pathOfFile, args.out_dir, args.max_open, stats, compression=args.compress)
+    elif args.workers > 1:
+        keys = split_parallel(pathOfFile, args.out_dir, args.workers, args.max_open, stats, args.compress)
+    else:
+        keys = split_stream(pathOfFile, args.out_dir, args.max_open, stats, args.compress)
+    output_format, files = convert_partitions(args.out_dir, keys, args.format, args.compress)
+    manifest_path = write_manifest(args.out_dir, output_format, files, stats)
+    print(f"Wrote {len(keys)} {output_format} partitions to {args.out_dir} (manifest: {manifest_path})")
+
+if __name__ == "__main__":
+    main()
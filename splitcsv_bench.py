@@ -0,0 +1,199 @@
+import os
+import csv
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import itertools
+import subprocess
+import threading
+from datetime import date, timedelta
+
+# Benchmark harness for splitcsv.py. It generates a synthetic Azure cost
+# export, runs each splitter mode end to end in its own process and appends
+# rows/sec, peak RSS and the open file descriptor high-water mark to a JSON
+# history file, tagged with the current git commit.
+
+SPLITCSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'splitcsv.py')
+HEADER = ['SubscriptionName', 'SubscriptionGuid', 'Date', 'ResourceGroup', 'MeterCategory',
+          'BillingNumber', 'CostInBillingCurrency', 'Quantity']
+METER_CATEGORIES = ['Virtual Machines', 'Storage', 'Bandwidth', 'Azure App Service', 'SQL Database', 'Log Analytics']
+BATCH_ROWS = 10000
+# splitcsv.py keys on the first five characters of the billing number, so
+# the generated numbers (five digits, a dash and three more) allow this many
+# distinct keys.
+MAX_KEYS = 100000
+SAMPLE_INTERVAL = 0.02
+
+# name -> extra splitcsv.py arguments; "{workers}" is filled in from the command line
+MODES = {
+    'stream': [],
+    'stream-max-open-8': ['--max-open', '8'],
+    'parallel': ['--workers', '{workers}'],
+    'incremental': ['--incremental'],
+    'gzip-out': ['--compress', 'gzip'],
+    'aggregate': ['--aggregate'],
+}
+
+def generate_csv(path, rows, keys, skew=1.0, seed=0):
+    """Write a synthetic cost export with `rows` rows spread over `keys` billing numbers.
+
+    Billing numbers follow a Zipf-like distribution: key i is drawn with
+    weight 1 / (i + 1) ** skew, so skew=0 is uniform and larger values pile
+    more rows onto a few keys.
+    """
+    if not 0 < keys <= MAX_KEYS:
+        raise ValueError(f'keys must be between 1 and {MAX_KEYS}')
+    rng = random.Random(seed)
+    billing_numbers = [f'{i:05d}-{rng.randrange(1000):03d}' for i in range(keys)]
+    cum_weights = list(itertools.accumulate(1.0 / (i + 1) ** skew for i in range(keys)))
+    subscriptions = [(f'sub-{i:03d}', f'{rng.getrandbits(128):032x}') for i in range(50)]
+    first_day = date(2024, 1, 1)
+    dates = [(first_day + timedelta(days=d)).strftime('%m/%d/%Y') for d in range(365)]
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        written = 0
+        while written < rows:
+            n = min(BATCH_ROWS, rows - written)
+            batch = []
+            for billing in rng.choices(billing_numbers, cum_weights=cum_weights, k=n):
+                name, guid = rng.choice(subscriptions)
+                batch.append([name, guid, rng.choice(dates), f'rg-{rng.randrange(200)}',
+                              rng.choice(METER_CATEGORIES), billing,
+                              f'{rng.expovariate(0.5):.6f}', f'{rng.random() * 24:.4f}'])
+            writer.writerows(batch)
+            written += n
+    return path
+
+def _process_tree(pid):
+    """pid and all of its descendants (Linux /proc only)."""
+    pids = [pid]
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/task/{p}/children') as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+def _watch_fds(pid, done, result):
+    """Poll the number of open descriptors across the process tree until done is set."""
+    while not done.is_set():
+        total = 0
+        for p in _process_tree(pid):
+            try:
+                total += len(os.listdir(f'/proc/{p}/fd'))
+            except OSError:
+                pass
+        result['max_fds'] = max(result.get('max_fds', 0), total)
+        done.wait(SAMPLE_INTERVAL)
+
+def run_mode(name, extra_args, data_path, rows):
+    """Run splitcsv.py once in a fresh output directory and measure it."""
+    out_dir = tempfile.mkdtemp(prefix=f'splitcsv-bench-{name}-')
+    try:
+        command = [sys.executable, SPLITCSV, data_path, '-o', out_dir] + extra_args
+        start = time.perf_counter()
+        proc = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        fds = {}
+        done = threading.Event()
+        watcher = None
+        if os.path.isdir('/proc'):
+            watcher = threading.Thread(target=_watch_fds, args=(proc.pid, done, fds), daemon=True)
+            watcher.start()
+        peak_rss = None
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(proc.pid, 0)
+            returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is KiB on Linux and bytes on macOS; it covers the child
+            # and the worker processes it waited for.
+            peak_rss = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+        else:
+            # No wait4 on Windows, so no peak RSS either.
+            returncode = proc.wait()
+        seconds = time.perf_counter() - start
+        done.set()
+        if watcher is not None:
+            watcher.join()
+        if returncode:
+            raise RuntimeError(f'{name}: splitcsv.py exited with {returncode}')
+        return {
+            'mode': name,
+            'args': extra_args,
+            'seconds': round(seconds, 4),
+            'rows_per_sec': round(rows / seconds),
+            'peak_rss_mb': round(peak_rss / (1 << 20), 1) if peak_rss is not None else None,
+            'max_open_fds': fds.get('max_fds'),
+        }
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(SPLITCSV),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def append_results(output, run):
+    """Add this run to the JSON history in `output` (a list, oldest first)."""
+    history = []
+    if os.path.exists(output):
+        with open(output) as f:
+            history = json.load(f)
+    history.append(run)
+    with open(output, 'w') as f:
+        json.dump(history, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark splitcsv.py on a synthetic Azure cost export.')
+    parser.add_argument('--rows', type=int, default=1000000, help='rows in the generated csv')
+    parser.add_argument('--keys', type=int, default=1000, help='distinct billing numbers')
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent for the billing number distribution (0 = uniform)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the data generator')
+    parser.add_argument('--data-dir', default=tempfile.gettempdir(), help='where generated csvs are kept and reused')
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=list(MODES), help='splitter modes to time')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='workers for the parallel mode')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per mode; the fastest is kept')
+    parser.add_argument('-o', '--output', default='splitcsv_bench.json', help='JSON file the results are appended to')
+    args = parser.parse_args()
+    if not 0 < args.keys <= MAX_KEYS:
+        parser.error(f'--keys must be between 1 and {MAX_KEYS}: the splitter keys on the first 5 characters')
+
+    data_path = os.path.join(args.data_dir, f'azurecosts-{args.rows}r-{args.keys}k-{args.skew:g}s-{args.seed}.csv')
+    if not os.path.exists(data_path):
+        print(f"Generating {args.rows:,} rows into {data_path}")
+        start = time.perf_counter()
+        generate_csv(data_path + '.tmp', args.rows, args.keys, args.skew, args.seed)
+        os.replace(data_path + '.tmp', data_path)
+        print(f"  took {time.perf_counter() - start:.1f}s")
+
+    results = []
+    for name in args.modes:
+        extra_args = [arg.format(workers=args.workers) for arg in MODES[name]]
+        best = min((run_mode(name, extra_args, data_path, args.rows) for _ in range(args.repeat)),
+                   key=lambda result: result['seconds'])
+        results.append(best)
+        rss = f"{best['peak_rss_mb']:>8.1f} MB" if best['peak_rss_mb'] is not None else f"{'n/a':>11}"
+        print(f"{name:<20} {best['seconds']:>9.2f}s {best['rows_per_sec']:>12,} rows/s {rss}  fds {best['max_open_fds']}")
+
+    append_results(args.output, {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'dataset': {'rows': args.rows, 'keys': args.keys, 'skew': args.skew, 'seed': args.seed,
+                    'bytes': os.path.getsize(data_path)},
+        'results': results,
+    })
+    print(f"Results appended to {args.output}")
+
+if __name__ == "__main__":
+    main()